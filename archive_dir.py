@@ -1,69 +1,313 @@
+"""
+归档目录下的文件。
+
+两种目录布局：
+
+- 'month'：按文件修改时间放入 1月…12月 文件夹（原有方式）；
+- 'date'：以 header_only 模式读取文件头的 starttime，放入 年/月/日 文件夹（如 2024/04/21），
+  复制文件不会改变归档位置，不同年份不会混在一起，每个文件夹的大小有上限。索引同时记录钢卷号，
+  locate(钢卷号) 直接查索引得到文件路径，不需要遍历目录。
+
+一次 os.scandir 遍历找出待归档的文件（跳过月份文件夹和年份文件夹，已归档的文件不再重复扫描），用线程池分块计算
+内容哈希，按哈希去重：内容相同的文件只保留一份，大小相同但内容不同的文件不再互相覆盖。
+同一磁盘内用 os.rename 移动，跨盘时才复制。已归档文件记录在 SQLite 索引中，
+每晚增量运行的耗时只与新文件数量有关。
+"""
+import hashlib
 import os
 import shutil
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from pathlib import Path
+
+from catalog import parse_starttime
+from ibabackend import get_backend
+from ibadatfile import read_info
+from shouPDA import coil_id_from_path
+
+INDEX_NAME = '.archive_index.sqlite'
+MONTH_FOLDERS = [f"{month}月" for month in range(1, 13)]
+LAYOUTS = ('month', 'date')
+
 
 def create_month_folders(base_dir):
     for month in range(1, 13):
         month_folder = os.path.join(base_dir, f"{month}月")
         os.makedirs(month_folder, exist_ok=True)
 
+
 def get_file_modification_month(file_path):
     mtime = os.path.getmtime(file_path)
     return datetime.fromtimestamp(mtime).month
 
-def move_file_to_month_folder(file_path, month_folders):
-    file_name = os.path.basename(file_path)
-    file_size = os.path.getsize(file_path)
-    target_folder = month_folders[get_file_modification_month(file_path) - 1]
+
+def file_hash(file_path, chunk_size=1 << 20):
+    """分块流式计算文件内容的 sha1，内存占用与文件大小无关。"""
+    digest = hashlib.sha1()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def scan_files(base_dir, skip=()):
+    """一次 os.scandir 遍历，返回 [(路径, 大小, 修改时间)]，跳过 base_dir 下名为 skip 的文件夹和索引文件。"""
+    result = []
+    stack = [(base_dir, True)]
+    while stack:
+        folder, top = stack.pop()
+        with os.scandir(folder) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    if not (top and entry.name in skip):
+                        stack.append((entry.path, False))
+                elif entry.is_file(follow_symlinks=False) and not entry.name.startswith(INDEX_NAME):
+                    st = entry.stat()  # Windows 上 scandir 已带回 stat 信息，不再单独访问文件
+                    result.append((entry.path, st.st_size, st.st_mtime))
+    return result
+
+
+class ArchiveIndex:
+    """已归档文件索引：内容哈希 -> 归档路径。"""
+
+    def __init__(self, path):
+        self.path = os.fspath(path)
+        self.conn = sqlite3.connect(self.path, timeout=30)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS archived ('
+            'hash TEXT PRIMARY KEY, path TEXT NOT NULL UNIQUE, size INTEGER, mtime REAL, '
+            'source TEXT, archived REAL, coil_id TEXT, starttime TEXT)'
+        )
+        columns = {row[1] for row in self.conn.execute('PRAGMA table_info(archived)')}
+        for column in ('coil_id', 'starttime'):
+            if column not in columns:  # 旧版本索引
+                self.conn.execute(f'ALTER TABLE archived ADD COLUMN {column} TEXT')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS archived_coil_id ON archived (coil_id)')
+        self.conn.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __len__(self):
+        return self.conn.execute('SELECT COUNT(*) FROM archived').fetchone()[0]
+
+    def lookup(self, digest):
+        """返回内容哈希对应的归档路径，没有时返回 None。"""
+        row = self.conn.execute('SELECT path FROM archived WHERE hash = ?', (digest,)).fetchone()
+        return row[0] if row else None
+
+    def has_path(self, path):
+        return self.conn.execute('SELECT 1 FROM archived WHERE path = ?', (path,)).fetchone() is not None
+
+    def add(self, digest, path, size, mtime, source, coil_id=None, starttime=None):
+        with self.conn:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO archived (hash, path, size, mtime, source, archived, coil_id, starttime) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (digest, path, size, mtime, source, time.time(), coil_id, starttime),
+            )
+
+    def locate(self, coil_id):
+        """钢卷号对应的全部归档文件（按 starttime、路径排序），走 coil_id 索引。"""
+        rows = self.conn.execute(
+            'SELECT path FROM archived WHERE coil_id = ? ORDER BY starttime, path', (coil_id,))
+        return [row[0] for row in rows]
+
+    def close(self):
+        self.conn.close()
+
+
+def free_target_path(target_folder, file_name, index):
+    """目标文件夹中不与已有文件重名的路径，重名时加 (n) 后缀。"""
     target_path = os.path.join(target_folder, file_name)
+    base, ext = os.path.splitext(file_name)
+    counter = 2
+    while index.has_path(target_path) or os.path.exists(target_path):
+        target_path = os.path.join(target_folder, f"{base}({counter}){ext}")
+        counter += 1
+    return target_path
+
+
+def move_file(file_path, target_path):
+    """同一磁盘内直接改名，跨盘时复制后删除。"""
+    if os.stat(file_path).st_dev == os.stat(os.path.dirname(target_path)).st_dev:
+        os.rename(file_path, target_path)
+    else:
+        shutil.move(file_path, target_path)
+
+
+def move_file_to_month_folder(file_path, month_folders, index, digest=None, size=None, mtime=None):
+    """
+    归档一个文件，返回 (归档路径, 是否移动)。
+
+    内容与已归档文件相同时删除该文件并返回 (已有的归档路径, False)；否则按修改时间移动到对应月份文件夹。
+    """
+    if size is None or mtime is None:
+        st = os.stat(file_path)
+        size, mtime = st.st_size, st.st_mtime
+    target_folder = month_folders[datetime.fromtimestamp(mtime).month - 1]
+    return archive_file(file_path, target_folder, index, digest, size, mtime)
+
+
+def date_folder(base_dir, start):
+    """starttime 对应的 年/月/日 文件夹。"""
+    return os.path.join(base_dir, f'{start.year:04d}', f'{start.month:02d}', f'{start.day:02d}')
+
+
+def file_start_time(file_path, backend=None, reader=None):
+    """以 header_only 模式读取文件的 starttime，读取失败时返回 None。"""
+    try:
+        return parse_starttime(read_info(file_path, ('starttime',), backend, reader)['starttime'])
+    except Exception as e:
+        print("Cannot read header:", file_path, e)
+        return None
+
+
+def move_file_to_date_folder(file_path, base_dir, index, digest=None, size=None, mtime=None, backend=None,
+                             reader=None):
+    """
+    按文件头的 starttime 归档到 年/月/日 文件夹，索引中记录钢卷号和 starttime，返回 (归档路径, 是否移动)。
+
+    读不出 starttime 的文件（非 .dat 或文件损坏）按修改时间归档。
+    """
+    if size is None or mtime is None:
+        st = os.stat(file_path)
+        size, mtime = st.st_size, st.st_mtime
+    start = file_start_time(file_path, backend, reader)
+    target_folder = date_folder(base_dir, start or datetime.fromtimestamp(mtime))
+    return archive_file(file_path, target_folder, index, digest, size, mtime,
+                        coil_id_from_path(file_path), start.isoformat(sep=' ') if start else None)
+
+
+def archive_file(file_path, target_folder, index, digest, size, mtime, coil_id=None, starttime=None):
+    """
+    按内容哈希去重后移动到 target_folder，返回 (归档路径, 是否移动)。
+
+    只有索引中的归档文件仍然存在且不是 file_path 本身时才把 file_path 当作重复文件删除；
+    索引记录已过期（归档文件被手动移走或删除）时按新文件归档，并更新索引。
+    """
+    digest = digest or file_hash(file_path)
+    existing = index.lookup(digest)
+    if existing == file_path:
+        return existing, False
+    if existing is not None and os.path.exists(existing):
+        print("Duplicate of", existing, "removed:", file_path)
+        os.remove(file_path)
+        return existing, False
+    os.makedirs(target_folder, exist_ok=True)
+    target_path = free_target_path(target_folder, os.path.basename(file_path), index)
+    move_file(file_path, target_path)
+    index.add(digest, target_path, size, mtime, file_path, coil_id, starttime)
+    return target_path, True
 
-    if os.path.exists(target_path):
-        existing_size = os.path.getsize(target_path)
-        if existing_size == file_size:
-            # If file sizes are the same, overwrite the file
-            shutil.move(file_path, target_path)
-            return
-        else:
-            # If file sizes are different, add a suffix and move the file
-            base, ext = os.path.splitext(file_name)
-            counter = 2
-            while os.path.exists(target_path):
-                target_path = os.path.join(target_folder, f"{base}({counter}){ext}")
-                counter += 1
-
-    shutil.move(file_path, target_path)
 
 # 删除目录下所有空文件夹
 def remove_empty_folders(path, remove_root=True):
+    """自底向上删除空文件夹，每个文件夹只列一次。返回 path 是否已被删除。"""
     if not os.path.isdir(path):
-        return
-    # remove empty subfolders
-    files = os.listdir(path)
-    if len(files):
-        for f in files:
-            fullpath = os.path.join(path, f)
-            if os.path.isdir(fullpath):
-                remove_empty_folders(fullpath)
+        return False
+    with os.scandir(path) as it:
+        entries = list(it)
+    empty = True
+    for entry in entries:
+        if not (entry.is_dir(follow_symlinks=False) and remove_empty_folders(entry.path)):
+            empty = False
 
     # if folder empty, delete it
-    files = os.listdir(path)
-    if len(files) == 0 and remove_root:
+    if empty and remove_root:
         print("Removing empty folder:", path)
         os.rmdir(path)
+        return True
+    return False
+
+
+def archive_folders(base_dir):
+    """
+    base_dir 下已归档区域的顶层文件夹名：月份文件夹和年份文件夹。
+
+    两种布局都跳过对方的归档文件夹，切换布局后已归档的文件不会被重新扫描、移动或当作重复文件删除。
+    """
+    with os.scandir(base_dir) as entries:
+        years = [entry.name for entry in entries
+                 if entry.is_dir(follow_symlinks=False) and len(entry.name) == 4 and entry.name.isdigit()]
+    return list(MONTH_FOLDERS) + years
+
+
+def index_existing(base_dir, index, workers=8, layout='month', backend=None):
+    """把已归档区域中已有但不在索引里的文件登记到索引（第一次使用索引时运行一次）。"""
+    files = []
+    for folder in archive_folders(base_dir):
+        folder_path = os.path.join(base_dir, folder)
+        if os.path.isdir(folder_path):
+            files.extend(item for item in scan_files(folder_path) if not index.has_path(item[0]))
+    with ThreadPoolExecutor(workers) as pool:
+        for (path, size, mtime), digest in zip(files, pool.map(file_hash, [item[0] for item in files])):
+            if index.lookup(digest) is None:
+                coil_id = starttime = None
+                if layout == 'date':
+                    start = file_start_time(path, backend)
+                    coil_id = coil_id_from_path(path)
+                    starttime = start.isoformat(sep=' ') if start else None
+                index.add(digest, path, size, mtime, path, coil_id, starttime)
+    return len(files)
+
+
+def archive_directory(base_dir, workers=8, index_path=None, layout='month', backend=None):
+    """
+    归档 base_dir 下已归档区域以外的全部文件。
+
+    Args:
+        workers: 计算哈希的线程数。
+        index_path: 归档索引路径，默认 base_dir 下的 .archive_index.sqlite。
+        layout: 'month' 按修改时间放入 1月…12月；'date' 按文件头 starttime 放入 年/月/日。
+        backend: 'date' 布局读取文件头使用的后端，见 ibabackend。
+
+    Returns:
+        dict: {'archived': 新归档的文件数, 'duplicates': 与已归档文件内容相同而删除的文件数}
+    """
+    if layout not in LAYOUTS:
+        raise ValueError(f'Unknown archive layout: {layout!r}, expected one of {LAYOUTS}')
+    month_folders = [os.path.join(base_dir, folder) for folder in MONTH_FOLDERS]
+    reader = None
+    if layout == 'month':
+        create_month_folders(base_dir)
+    else:
+        reader = get_backend(backend).create_reader()  # 所有文件复用一个 reader 读取文件头
+    index_path = index_path or os.path.join(base_dir, INDEX_NAME)
+    archived = duplicates = 0
+    with ArchiveIndex(index_path) as index:
+        if len(index) == 0:
+            index_existing(base_dir, index, workers, layout, backend)
+        files = scan_files(base_dir, skip=archive_folders(base_dir))
+        with ThreadPoolExecutor(workers) as pool:
+            # 哈希在线程池中流水计算，主线程按顺序归档
+            digests = pool.map(file_hash, [path for path, _, _ in files])
+            for (file_path, size, mtime), digest in zip(files, digests):
+                if layout == 'month':
+                    path, moved = move_file_to_month_folder(file_path, month_folders, index, digest, size, mtime)
+                else:
+                    path, moved = move_file_to_date_folder(file_path, base_dir, index, digest, size, mtime,
+                                                        backend, reader)
+                if moved:
+                    archived += 1
+                elif path != file_path:
+                    duplicates += 1
+    return {'archived': archived, 'duplicates': duplicates}
 
 
-def archive_directory(base_dir):
-    create_month_folders(base_dir)
-    month_folders = [os.path.join(base_dir, f"{month}月") for month in range(1, 13)]
+def locate(coil_id, base_dir=None, index_path=None):
+    """由钢卷号查归档文件路径，只查索引，不遍历目录。"""
+    with ArchiveIndex(index_path or os.path.join(base_dir, INDEX_NAME)) as index:
+        return index.locate(coil_id)
 
-    for root, _, files in os.walk(base_dir):
-        for file in files:
-            file_path = os.path.join(root, file)
-            if os.path.isfile(file_path):
-                move_file_to_month_folder(file_path, month_folders)
 
 if __name__ == "__main__":
     base_directory = r"E:\baoSteel\ibaAPI\test\dat_dir"
-    archive_directory(base_directory)
-    remove_empty_folders(base_directory)
\ No newline at end of file
+    print(archive_directory(base_directory, layout='date'))
+    remove_empty_folders(base_directory)
+    # print(locate('H124214505100', base_directory))
@@ -0,0 +1,96 @@
+"""
+打开文件耗时对比：header_only 模式与完整打开。
+
+两种模式都复用同一个 reader，只读取 starttime/frames/clk 和 Technostring 钢卷号；
+完整打开按默认 preload=True 打开并枚举通道（archive_dir、目录扫描以前的做法）。
+
+用法::
+
+    python benchmark_open.py 数据目录 [--backend com] [--repeat 3]
+    python benchmark_open.py --synthetic 50         # 生成临时 .npdat 文件，用 native 后端测试
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+import numpy as np
+
+from catalog import scan_dat_files
+from ibabackend import MemoryChannel, MemoryFile, get_backend
+from ibadatfile import IbaDatFile
+
+INFO_NAMES = ('starttime', 'frames', 'clk', 'Technostring 1.strip number')
+
+
+def open_header(path, backend, reader):
+    with IbaDatFile(path, backend=backend, reader=reader, header_only=True) as file:
+        return [file.query_info_by_name(name) for name in INFO_NAMES]
+
+
+def open_full(path, backend, reader):
+    with IbaDatFile(path, backend=backend, reader=reader) as file:
+        info = [file.query_info_by_name(name) for name in INFO_NAMES]
+        file.channel_names()
+        return info
+
+
+def make_synthetic(directory: str, files: int, channels: int = 200, frames: int = 20000) -> list[str]:
+    """生成 files 个 .npdat 测试文件（channels 个 float32 通道，每个 frames 点），返回对应的 .dat 路径。"""
+    from ibanative import write_npdat
+
+    rng = np.random.default_rng(0)
+    values = rng.standard_normal(frames).astype(np.float32)
+    memory = get_backend('memory')
+    paths = []
+    for i in range(files):
+        path = os.path.join(directory, f'H{i:09d}_1.dat')
+        info = {'clk': '0.008', 'frames': str(frames), 'starttime': '21.04.2024 17:00:09.000000',
+                'Technostring 1.strip number': f'H{i:09d}'}
+        memory.register(path, MemoryFile(info, [MemoryChannel(f'A{j}', values, channel_id=j) for j in range(channels)]))
+        with IbaDatFile(path, backend=memory) as file:
+            write_npdat(file, info_names=list(info))
+        memory.files.pop(path)
+        paths.append(path)
+    return paths
+
+
+def bench(open_file, paths, backend, repeat: int) -> list[float]:
+    """返回每个文件每次打开的耗时（毫秒）。"""
+    reader = get_backend(backend).create_reader()
+    latencies = []
+    for _ in range(repeat):
+        for path in paths:
+            start = time.perf_counter()
+            open_file(path, backend, reader)
+            latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def report(name: str, latencies: list[float]):
+    latencies = sorted(latencies)
+    p95 = latencies[min(int(len(latencies) * 0.95), len(latencies) - 1)]
+    print(f'{name:<12} 平均 {statistics.mean(latencies):8.3f} ms  中位数 {statistics.median(latencies):8.3f} ms  '
+          f'p95 {p95:8.3f} ms  ({len(latencies)} 次)')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='header_only 与完整打开的单文件耗时对比')
+    parser.add_argument('directory', nargs='?', help='.dat 文件所在目录')
+    parser.add_argument('--backend', default=None, help='读取后端，默认 $IBA_BACKEND 或 com')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--synthetic', type=int, default=0, help='生成 N 个临时 .npdat 文件并用 native 后端测试')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.synthetic:
+            dat_paths = make_synthetic(tmp, args.synthetic)
+            args.backend = 'native'
+        else:
+            dat_paths = scan_dat_files(args.directory)
+        print('文件数', len(dat_paths), '后端', get_backend(args.backend).name)
+        report('header_only', bench(open_header, dat_paths, args.backend, args.repeat))
+        report('完整打开', bench(open_full, dat_paths, args.backend, args.repeat))
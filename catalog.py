@@ -0,0 +1,238 @@
+"""
+目录级钢卷目录（coil catalog）。
+
+并行扫描目录树中的 .dat 文件，只读取文件头信息（Technostring 钢卷号、钢种、来料/成品宽度和厚度、
+starttime、frames、clk），存入带索引的 SQLite 表。之后按钢种、厚度、时间等条件查询只访问这张表，
+不再逐个打开文件。再次刷新时按文件大小和修改时间只处理新增或改动过的文件，已删除的文件从目录中移除。
+
+用法::
+
+    catalog = CoilCatalog('./coil_catalog.sqlite')
+    print(catalog.refresh(r'E:\\baoSteel\\ibaAPI\\data', workers=8))
+    paths = catalog.query(steel_grade='DC04', min_thickness=2.0,
+                          start=datetime.datetime(2024, 3, 1), stop=datetime.datetime(2024, 4, 1))
+    catalog.to_frame().to_parquet('./coil_catalog.parquet')
+"""
+from __future__ import annotations
+
+import datetime
+import json
+import os
+import sqlite3
+from multiprocessing import Pool
+
+import pandas as pd
+
+from ibabackend import init_worker, worker_reader
+from ibadatfile import IbaDatFile
+
+# 目录表的列 -> 文件信息名
+HEADER_FIELDS = {
+    'strip_number': 'Technostring 1.strip number',
+    'steel_grade': 'Technostring 1.steel grade',
+    'entry_width': 'Technostring 1.entry width',
+    'exit_width': 'Technostring 1.exit width',
+    'entry_thickness': 'Technostring 1.entry thickness',
+    'exit_thickness': 'Technostring 1.exit thickness',
+    'starttime': 'starttime',
+    'frames': 'frames',
+    'clk': 'clk',
+}
+NUMERIC_FIELDS = ('entry_width', 'exit_width', 'entry_thickness', 'exit_thickness', 'frames', 'clk')
+# 额外保存在 info 列中的文件信息
+EXTRA_INFO = ['Technostring 1.technostring', 'Technostring 1.time', 'version', 'type', 'name']
+STARTTIME_FORMATS = ('%d.%m.%Y %H:%M:%S.%f', '%d.%m.%Y %H:%M:%S')
+
+COLUMNS = ['path', 'size', 'mtime'] + list(HEADER_FIELDS) + ['info']
+
+
+def scan_dat_files(root: os.PathLike, suffix: str = '.dat') -> list[str]:
+    """用 os.scandir 递归列出目录树中的 .dat 文件。"""
+    paths = []
+    stack = [os.fspath(root)]
+    while stack:
+        with os.scandir(stack.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.name.lower().endswith(suffix):
+                    paths.append(entry.path)
+    return paths
+
+
+def _number(value: str) -> float | None:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_starttime(value: str) -> datetime.datetime | None:
+    """解析文件信息中的 starttime（ShouPDA 带毫秒、BaoPDA 不带），无法解析时返回 None。"""
+    for fmt in STARTTIME_FORMATS:
+        try:
+            return datetime.datetime.strptime(value, fmt)
+        except (TypeError, ValueError):
+            continue
+    return None
+
+
+def _starttime(value: str) -> str | None:
+    """starttime 转换为 ISO 格式字符串，便于按时间范围查询和排序。"""
+    start = parse_starttime(value)
+    return start.isoformat(sep=' ') if start is not None else None
+
+
+def read_header(path: os.PathLike, backend=None, reader=None) -> dict:
+    """以 header_only 模式打开文件，读取目录表需要的文件头信息。"""
+    with IbaDatFile(path, backend=backend, reader=reader, header_only=True) as file:
+        values = {column: file.query_info_by_name(name) for column, name in HEADER_FIELDS.items()}
+        info = {name: file.query_info_by_name(name) for name in EXTRA_INFO}
+    for column in NUMERIC_FIELDS:
+        values[column] = _number(values[column])
+    values['starttime'] = _starttime(values['starttime'])
+    values['info'] = json.dumps(info, ensure_ascii=False)
+    return values
+
+
+def _header_task(args) -> tuple[str, dict | None, str | None]:
+    """进程池任务：返回 (路径, 文件头, 错误信息)，异常不向外抛出。"""
+    path, backend = args
+    try:
+        return path, read_header(path, backend, worker_reader()), None
+    except Exception as e:
+        return path, None, str(e)
+
+
+class CoilCatalog:
+    """SQLite 钢卷目录。"""
+
+    def __init__(self, path: os.PathLike = './coil_catalog.sqlite'):
+        self.path = os.fspath(path)
+        self.conn = sqlite3.connect(self.path, timeout=30)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS coils ('
+            'path TEXT PRIMARY KEY, size INTEGER, mtime REAL, strip_number TEXT, steel_grade TEXT, '
+            'entry_width REAL, exit_width REAL, entry_thickness REAL, exit_thickness REAL, '
+            'starttime TEXT, frames INTEGER, clk REAL, info TEXT)'
+        )
+        for column in ('strip_number', 'steel_grade', 'starttime', 'exit_thickness'):
+            self.conn.execute(f'CREATE INDEX IF NOT EXISTS coils_{column} ON coils ({column})')
+        self.conn.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def refresh(self, root: os.PathLike, workers: int = 8, backend=None) -> dict:
+        """
+        扫描 root 下的 .dat 文件并更新目录：只读取新增或大小/修改时间变化的文件，删除已不存在的文件。
+
+        Args:
+            workers: 并行读取文件头的进程数，小于等于 1 时在当前进程中读取。
+            backend: 读取后端，见 ibabackend。
+
+        Returns:
+            dict: {'scanned', 'updated', 'removed', 'failed'}，failed 为 (路径, 错误信息) 列表。
+        """
+        root = os.fspath(root)
+        known = {row[0]: row[1:] for row in self.conn.execute('SELECT path, size, mtime FROM coils')}
+        stats = {}
+        todo = []
+        for path in scan_dat_files(root):
+            st = os.stat(path)
+            stats[path] = (st.st_size, st.st_mtime)
+            if known.get(path) != stats[path]:
+                todo.append(path)
+        prefix = os.path.join(root, '')
+        removed = [path for path in known if path.startswith(prefix) and path not in stats]
+        with self.conn:
+            self.conn.executemany('DELETE FROM coils WHERE path = ?', [(path,) for path in removed])
+
+        tasks = [(path, backend) for path in todo]
+        if workers > 1 and len(tasks) > 1:
+            with Pool(workers, initializer=init_worker, initargs=(backend,)) as pool:
+                failed = self._store(pool.imap_unordered(_header_task, tasks, chunksize=8), stats)
+        else:
+            init_worker(backend)
+            failed = self._store(map(_header_task, tasks), stats)
+        return {'scanned': len(stats), 'updated': len(todo) - len(failed), 'removed': len(removed),
+                'failed': failed}
+
+    def _store(self, results, stats: dict, batch: int = 500) -> list[tuple[str, str]]:
+        """写入文件头结果，每 batch 个文件提交一次。"""
+        failed = []
+        rows = []
+        placeholders = ', '.join('?' * len(COLUMNS))
+        for path, header, error in results:
+            if error is not None:
+                print(os.path.basename(path), 'error!', error)
+                failed.append((path, error))
+                continue
+            size, mtime = stats[path]
+            rows.append((path, size, mtime) + tuple(header[column] for column in COLUMNS[3:]))
+            if len(rows) >= batch:
+                with self.conn:
+                    self.conn.executemany(f'INSERT OR REPLACE INTO coils VALUES ({placeholders})', rows)
+                rows = []
+        with self.conn:
+            self.conn.executemany(f'INSERT OR REPLACE INTO coils VALUES ({placeholders})', rows)
+        return failed
+
+    def query(
+            self,
+            steel_grade: str | None = None,
+            strip_number: str | None = None,
+            start: datetime.datetime | None = None,
+            stop: datetime.datetime | None = None,
+            min_thickness: float | None = None,
+            max_thickness: float | None = None,
+            min_width: float | None = None,
+            max_width: float | None = None,
+    ) -> list[str]:
+        """
+        按条件查询文件路径（按 starttime 排序），只访问目录表。
+
+        时间范围为 [start, stop)；厚度、宽度为成品（exit）值，范围含端点。
+        """
+        conditions = []
+        params = []
+        for column, op, value in (
+                ('steel_grade', '=', steel_grade),
+                ('strip_number', '=', strip_number),
+                ('starttime', '>=', start.isoformat(sep=' ') if start is not None else None),
+                ('starttime', '<', stop.isoformat(sep=' ') if stop is not None else None),
+                ('exit_thickness', '>=', min_thickness),
+                ('exit_thickness', '<=', max_thickness),
+                ('exit_width', '>=', min_width),
+                ('exit_width', '<=', max_width),
+        ):
+            if value is not None:
+                conditions.append(f'{column} {op} ?')
+                params.append(value)
+        where = f' WHERE {" AND ".join(conditions)}' if conditions else ''
+        rows = self.conn.execute(f'SELECT path FROM coils{where} ORDER BY starttime', params)
+        return [row[0] for row in rows]
+
+    def to_frame(self) -> pd.DataFrame:
+        """整个目录表，可另存为 Parquet。"""
+        return pd.read_sql_query('SELECT * FROM coils ORDER BY starttime', self.conn)
+
+    def __len__(self) -> int:
+        return self.conn.execute('SELECT COUNT(*) FROM coils').fetchone()[0]
+
+    def close(self):
+        self.conn.close()
+
+
+if __name__ == '__main__':
+    import sys
+
+    # 用法: python catalog.py 数据目录 [目录表路径]
+    data_dir = sys.argv[1] if len(sys.argv) > 1 else r'E:\baoSteel\ibaAPI\data'
+    with CoilCatalog(sys.argv[2] if len(sys.argv) > 2 else './coil_catalog.sqlite') as catalog:
+        print(catalog.refresh(data_dir))
+        print('目录中的文件数', len(catalog))
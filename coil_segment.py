@@ -0,0 +1,221 @@
+"""
+流式钢卷分割。
+
+按文件（或文件内的块）依次读取数据帧，用状态机检测钢卷边界并立即写出每一段，
+跨文件只保留常数大小的状态（上一帧长度、当前恒定段起点、当前段起点），不再把多个文件
+pd.concat 成不断增长的 DataFrame，也不需要 read_step/coil_file_num_max 之类的内存控制参数。
+
+分段规则（与 length_cut_position 原逻辑一致）：
+
+- 钢卷长度相邻帧差分小于 length_jump（如 -1000）时，新卷从该帧开始，上一段以 COIL 结束；
+- 长度连续 standstill_frames 帧以上不变（长时间停机）时，在停机结束（长度开始变化）处分段，上一段以 STANDSTILL 结束；
+- 数据读完时最后一段以 END 结束。
+
+用法::
+
+    segmenter = CoilSegmenter('ACTUAL STRIP LENGTH', length_jump=-1000, standstill_frames=24000)
+    writer = SegmentWriter('./processed', 'csv', down_sample=10)
+    for piece, reason in split_coils(iter_frame_blocks(paths), segmenter):
+        writer.write(piece)
+        if reason is not None:
+            writer.end(f'卷{n:03d}')
+"""
+from __future__ import annotations
+
+import os
+from typing import Iterable, Iterator
+
+import numpy as np
+import pandas as pd
+
+from export_engine import TableWriter, open_writer, output_path
+from ibabackend import Backend
+from ibadatfile import IbaDatFile
+from resample import decimate_frame
+from rle import long_runs, run_lengths
+
+COIL = 'coil'
+STANDSTILL = 'standstill'
+END = 'end'
+
+
+def iter_frame_blocks(
+        paths: Iterable[os.PathLike],
+        analog_only: bool = True,
+        chunk_size: int | None = None,
+        backend: str | Backend | None = None,
+        file_class: type[IbaDatFile] = IbaDatFile,
+) -> Iterator[pd.DataFrame]:
+    """
+    依次打开文件，逐块产出数据帧，同一时刻只持有一个文件（chunk_size 给定时为一个块）的数据。
+
+    Args:
+        paths: 按时间顺序排列的 .dat 文件。
+        analog_only: 只保留模拟量通道（原脚本删除第一行为 True/False 的列）。
+        chunk_size: 文件内每块的帧数，None 时每个文件为一块。块按 IbaDatFile.data(frames=...) 读取：
+            帧区间按时间换算为各通道的采样点区间，采样周期不同的通道抛出 ValueError，不会错位拼接。
+        backend: 读取后端，见 ibabackend。
+        file_class: 文件类，如 BaoPDA。
+
+    只读取时间通道（长度通道没有帧时刻）。各块的列与第一个文件一致，后续文件缺少的列填 NaN、多出的列丢弃。
+    """
+    columns = None
+    for path in paths:
+        print('读取', path)
+        with file_class(path, backend=backend) as file:
+            kind = 'analog' if analog_only else None
+            names = [channel.name() for channel in file.project(kind=kind) if channel.is_time_based()]
+            if chunk_size is None:
+                windows = [None]
+            else:
+                windows = [(start, start + chunk_size) for start in range(0, file.frames(), chunk_size)]
+            for frames in windows:
+                block = file.data(names, kind=kind, frames=frames)
+                if columns is None:
+                    columns = block.columns
+                elif not block.columns.equals(columns):
+                    block = block.reindex(columns=columns)
+                yield block
+
+
+def find_standstills(length, min_frames: int = 24000) -> tuple[np.ndarray, np.ndarray]:
+    """整段数据中长度连续 min_frames 帧以上不变的区间 [start, stop)。"""
+    return long_runs(np.asarray(length), min_frames)
+
+
+def find_coil_starts(length, length_jump: float = -1000) -> np.ndarray:
+    """整段数据中新卷开始的帧序号（长度跳变小于 length_jump 处）。"""
+    starts, _, values = run_lengths(np.asarray(length))
+    return starts[1:][np.diff(values) < length_jump]
+
+
+class CoilSegmenter:
+    """
+    钢卷分段状态机。依次 feed 数据块，产出 (片段, 结束原因)：
+
+    - 结束原因为 None 表示当前段在下一块中继续；
+    - 为 COIL/STANDSTILL 表示当前段到此片段为止，之后的数据属于新的一段。
+
+    片段可能为空（边界恰好在块的第一帧）。状态只有几个整数和上一帧长度，与已读数据量无关。
+    """
+
+    def __init__(self, length_column: str = 'ACTUAL STRIP LENGTH', length_jump: float = -1000,
+                 standstill_frames: int = 24000):
+        self.length_column = length_column
+        self.length_jump = length_jump
+        self.standstill_frames = standstill_frames
+        self.frame = 0  # 已处理的总帧数
+        self.segment_start = 0  # 当前段起始帧
+        self.run_start = 0  # 当前恒定长度段的起始帧
+        self.last = None  # 上一块最后一帧的长度
+
+    def boundaries(self, length: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        返回本块内的分段位置（块内序号，新段从该帧开始）及对应的结束原因，并更新跨块状态。
+
+        对本块（前面接上一块最后一帧）做游程编码：钢卷边界只可能出现在游程起点，
+        即相邻游程的长度值之差小于 length_jump 处；停机为总长（含上一块延续部分）不小于
+        standstill_frames 的游程，在其结束处分段。
+        """
+        carried = self.last is not None
+        starts, _, values = run_lengths(np.concatenate(([self.last], length)) if carried else length)
+        positions = starts[1:] - int(carried)  # 块内新游程的起点
+        cuts = positions[np.diff(values) < self.length_jump]
+        run_starts = np.concatenate(([self.run_start], self.frame + positions))
+        standstill = positions[np.diff(run_starts) >= self.standstill_frames]
+        standstill = np.setdiff1d(standstill, cuts)  # 同一位置既是停机结束又是新卷时按新卷处理
+        self.run_start = int(run_starts[-1])
+        self.last = length[-1]
+        positions = np.concatenate((cuts, standstill))
+        reasons = np.array([COIL] * len(cuts) + [STANDSTILL] * len(standstill), dtype=object)
+        order = np.argsort(positions, kind='stable')
+        return positions[order], reasons[order]
+
+    def feed(self, block: pd.DataFrame) -> Iterator[tuple[pd.DataFrame, str | None]]:
+        """处理一个数据块。"""
+        if len(block) == 0:
+            return
+        length = block[self.length_column].to_numpy(dtype=np.float64)
+        positions, reasons = self.boundaries(length)
+        start = 0
+        for position, reason in zip(positions, reasons):
+            yield block.iloc[start:position], reason
+            self.segment_start = self.frame + int(position)
+            start = position
+        yield block.iloc[start:], None
+        self.frame += len(block)
+
+    def finish(self) -> Iterator[tuple[pd.DataFrame, str | None]]:
+        """数据结束，关闭最后一段。"""
+        if self.frame > self.segment_start:
+            yield pd.DataFrame(), END
+        self.segment_start = self.frame
+
+
+def split_coils(blocks: Iterable[pd.DataFrame], segmenter: CoilSegmenter | None = None,
+                ) -> Iterator[tuple[pd.DataFrame, str | None]]:
+    """对数据块流分段，见 CoilSegmenter。"""
+    segmenter = segmenter or CoilSegmenter()
+    for block in blocks:
+        yield from segmenter.feed(block)
+    yield from segmenter.finish()
+
+
+class SegmentWriter:
+    """
+    把分段片段流式写出：片段到达时立即写入当前段的写出器（可选按块降采样），段结束时按给定文件名落盘。
+    """
+
+    def __init__(self, output_dir: os.PathLike, fmt: str = 'csv', down_sample: int = 1, how: str = 'mean',
+                 **options):
+        self.output_dir = os.fspath(output_dir)
+        self.fmt = fmt
+        self.down_sample = down_sample
+        self.how = how
+        self.options = options
+        self._writer: TableWriter | None = None
+        self._pending: pd.DataFrame | None = None  # 不足 down_sample 行、留待下一片段的尾部
+
+    def write(self, piece: pd.DataFrame):
+        """追加当前段的一个片段。"""
+        if len(piece) == 0:
+            return
+        if self.down_sample > 1:
+            if self._pending is not None:
+                piece = pd.concat([self._pending, piece], ignore_index=True)
+            whole = len(piece) - len(piece) % self.down_sample
+            self._pending = piece.iloc[whole:]
+            piece = piece.iloc[:whole]
+            if len(piece) == 0:
+                return
+            piece = decimate_frame(piece, self.down_sample, self.how)
+        self._write(piece)
+
+    def _write(self, df: pd.DataFrame):
+        if self._writer is None:
+            # 段结束时才知道文件名，先写到输出目录下的临时名，结束时原子改名
+            os.makedirs(self.output_dir, exist_ok=True)
+            self._writer = open_writer(os.path.join(self.output_dir, f'.segment_{os.getpid()}'), self.fmt,
+                                       **self.options)
+        self._writer.write(df)
+
+    def end(self, name: str) -> str | None:
+        """
+        结束当前段并写出为输出目录下的 name（不含扩展名），返回实际输出路径；当前段没有数据时返回 None。
+        """
+        if self._pending is not None and len(self._pending):
+            self._write(decimate_frame(self._pending, self.down_sample, self.how))
+        self._pending = None
+        writer, self._writer = self._writer, None
+        if writer is None:
+            return None
+        writer.path = output_path(os.path.join(self.output_dir, name), self.fmt)
+        writer.close()
+        return writer.path
+
+    def abort(self):
+        """放弃当前段。"""
+        self._pending = None
+        if self._writer is not None:
+            self._writer.abort()
+            self._writer = None
@@ -0,0 +1,245 @@
+"""
+多文件虚拟数据集。
+
+把按时间连续记录的一组 .dat 文件（bao*.dat、ShouPDA 的 H..._1_00.dat 分段文件等）当作一个连续的数据集：
+构造时只以 header_only 模式读取每个文件的 starttime/frames/clk，建立全局帧序号和时间索引；
+切片时只打开并读取切片涉及的文件，打开的文件保存在有上限的 LRU 中，不再需要 pd.concat 全部文件。
+
+用法::
+
+    with IbaDataset(glob.glob(r'E:\\baoSteel\\ibaAPI\\data\\bao*.dat'), file_class=BaoPDA) as dataset:
+        df = dataset[120000:180000]                         # 跨文件的全局帧区间，按时间索引
+        length = dataset['ACTUAL STRIP LENGTH'][:500000]    # 单个通道，ndarray
+        df = dataset.read(names=['ACTUAL STRIP LENGTH'], time=(t0, t1))
+"""
+from __future__ import annotations
+
+import datetime
+import os
+from collections import OrderedDict
+from typing import Iterable, Iterator
+
+import numpy as np
+import pandas as pd
+
+from catalog import parse_starttime
+from ibabackend import Backend, get_backend
+from ibadatfile import IbaDatFile, read_info
+from resample import grid_times, resample, to_ns
+
+
+class IbaDataset:
+    """按时间顺序排列的多个 .dat 文件组成的连续数据集，全局帧序号从 0 开始。"""
+
+    def __init__(
+            self,
+            paths: Iterable[os.PathLike],
+            backend: str | Backend | None = None,
+            max_open: int = 4,
+            file_class: type[IbaDatFile] = IbaDatFile,
+            sort: bool = True,
+    ):
+        """
+        Args:
+            paths: .dat 文件。
+            backend: 读取后端，见 ibabackend。
+            max_open: 同时保持打开的文件数上限（LRU）。
+            file_class: 文件类，如 ShouPDA、BaoPDA。
+            sort: 按 starttime 排序，否则保持 paths 的顺序。
+        """
+        self.backend = get_backend(backend)
+        self.max_open = max(int(max_open), 1)
+        self.file_class = file_class
+        reader = self.backend.create_reader()  # 读取文件头时复用一个 reader
+        headers = []
+        for path in paths:
+            path = os.fspath(path)
+            info = read_info(path, ('starttime', 'frames', 'clk'), self.backend, reader)
+            start = parse_starttime(info['starttime'])
+            if start is None:
+                raise ValueError(f'Cannot parse starttime {info["starttime"]!r} of {path}')
+            headers.append((start, path, int(info['frames']), float(info['clk'])))
+        if sort:
+            headers.sort(key=lambda header: header[0])
+        self.paths = [header[1] for header in headers]
+        self.start_times = np.array([header[0] for header in headers], dtype='datetime64[ns]')
+        self.frames = np.array([header[2] for header in headers], dtype=np.int64)
+        self.clks = np.array([header[3] for header in headers], dtype=np.float64)
+        # offsets[i] 为第 i 个文件第一帧的全局帧序号，offsets[-1] 为总帧数
+        self.offsets = np.concatenate(([0], np.cumsum(self.frames)))
+        self._open_files: OrderedDict[int, IbaDatFile] = OrderedDict()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __len__(self) -> int:
+        return int(self.offsets[-1])
+
+    def __getitem__(self, index):
+        """dataset[a:b] 返回全局帧区间的 DataFrame；dataset['通道名'] 返回 DatasetChannel。"""
+        if isinstance(index, str):
+            return DatasetChannel(self, index)
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                raise ValueError('IbaDataset slices do not support a step.')
+            return self.read(frames=(start, stop))
+        raise TypeError(f'IbaDataset indices must be slices or channel names, not {type(index).__name__}')
+
+    def open(self, i: int) -> IbaDatFile:
+        """返回已打开的第 i 个文件，超过 max_open 时关闭最久未使用的文件。"""
+        file = self._open_files.get(i)
+        if file is not None:
+            self._open_files.move_to_end(i)
+            return file
+        file = self.file_class(self.paths[i], backend=self.backend).__enter__()
+        self._open_files[i] = file
+        while len(self._open_files) > self.max_open:
+            _, oldest = self._open_files.popitem(last=False)
+            oldest.__exit__(None, None, None)
+        return file
+
+    def close(self):
+        while self._open_files:
+            _, file = self._open_files.popitem()
+            file.__exit__(None, None, None)
+
+    def locate(self, frame: int) -> tuple[int, int]:
+        """全局帧序号 -> (文件序号, 文件内帧序号)。"""
+        if not 0 <= frame < len(self):
+            raise IndexError(frame)
+        i = int(np.searchsorted(self.offsets, frame, side='right')) - 1
+        return i, int(frame - self.offsets[i])
+
+    def frame_at(self, t) -> int:
+        """
+        时刻 -> 全局帧序号：该时刻所在（或之后第一个）帧。
+
+        t 为 datetime，或相对第一个文件 starttime 的秒。落在两个文件之间的空档时取下一个文件的第一帧。
+        """
+        if isinstance(t, (datetime.datetime, np.datetime64)):
+            t = np.datetime64(pd.Timestamp(t).to_datetime64(), 'ns')
+        else:
+            t = self.start_times[0] + np.timedelta64(to_ns(t), 'ns')
+        i = max(int(np.searchsorted(self.start_times, t, side='right')) - 1, 0)
+        rel = int((t - self.start_times[i]) // np.timedelta64(1, 'ns'))
+        clk = to_ns(self.clks[i])
+        local = min(max(-(-rel // clk), 0), int(self.frames[i]))
+        return int(self.offsets[i]) + local
+
+    def time_index(self, start: int = 0, stop: int | None = None) -> pd.DatetimeIndex:
+        """全局帧区间 [start, stop) 每一帧的时刻，由各文件的 starttime 和 clk 计算。"""
+        stop = len(self) if stop is None else stop
+        parts = [self._file_times(i, lo, hi - lo) for i, lo, hi in self._spans(start, stop)]
+        if not parts:
+            return pd.DatetimeIndex([], name='time')
+        return pd.DatetimeIndex(np.concatenate(parts), name='time')
+
+    def _file_times(self, i: int, lo: int, count: int) -> np.ndarray:
+        """第 i 个文件从第 lo 帧开始 count 帧的时刻。"""
+        frames = np.arange(lo, lo + count, dtype=np.int64)
+        return self.start_times[i] + (frames * to_ns(self.clks[i])).astype('timedelta64[ns]')
+
+    def _spans(self, start: int, stop: int) -> Iterator[tuple[int, int, int]]:
+        """全局帧区间 [start, stop) 覆盖的 (文件序号, 文件内起始帧, 文件内结束帧)。"""
+        start, stop = max(start, 0), min(stop, len(self))
+        if start >= stop:
+            return
+        first = int(np.searchsorted(self.offsets, start, side='right')) - 1
+        for i in range(first, len(self.paths)):
+            offset = int(self.offsets[i])
+            if offset >= stop:
+                break
+            yield i, max(start - offset, 0), min(stop - offset, int(self.frames[i]))
+
+    def read(
+            self,
+            names: Iterable[str] | None = None,
+            pattern=None,
+            kind: str | None = None,
+            timebase=None,
+            frames: tuple[int | None, int | None] | None = None,
+            time: tuple | None = None,
+    ) -> pd.DataFrame:
+        """
+        读取全局帧区间（frames）或时间区间（time，datetime 或相对第一个文件 starttime 的秒）的数据，
+        以时间为索引，每一行为一帧。只打开区间涉及的文件，通道筛选条件见 IbaDatFile.project。
+
+        各通道按自身采样周期和滞后保持取值到帧时刻（见 frame_values），不同采样率的通道可以一起读取。
+        模拟量为 float32、数字量为 uint8，模拟量列在前。长度通道没有时间轴，不包含在内。
+        """
+        if time is not None:
+            if frames is not None:
+                raise ValueError('Give either frames or time, not both.')
+            frames = tuple(None if t is None else self.frame_at(t) for t in time)
+        start, stop = frames if frames is not None else (None, None)
+        start = 0 if start is None else start
+        stop = len(self) if stop is None else stop
+        names = list(names) if names is not None else None
+        parts = []
+        for i, lo, hi in self._spans(start, stop):
+            channels = [channel for channel in self.open(i).project(names, pattern, kind, timebase)
+                        if channel.is_time_based()]
+            channels.sort(key=lambda channel: bool(channel.is_bool()))  # 模拟量在前，各自保持文件顺序
+            columns = {channel.name(): self.frame_values(i, channel, lo, hi) for channel in channels}
+            index = pd.DatetimeIndex(self._file_times(i, lo, hi - lo), name='time')
+            parts.append(pd.DataFrame(columns, index=index))
+        if not parts:
+            return pd.DataFrame(index=pd.DatetimeIndex([], name='time'))
+        return pd.concat(parts) if len(parts) > 1 else parts[0]
+
+    def frame_values(self, i: int, channel, lo: int, hi: int) -> np.ndarray:
+        """
+        第 i 个文件 [lo, hi) 帧时刻上的通道值：取每帧时刻之前最近的采样点（hold），只读取覆盖区间的采样点。
+
+        滞后之前和通道结束之后模拟量为 NaN、数字量为 0。
+        """
+        if not channel.is_time_based():
+            raise ValueError(f'Channel {channel.name()!r} is length-based and has no frame times.')
+        clk = float(self.clks[i])
+        times_ns = grid_times(lo, hi, to_ns(clk))
+        base = float(channel.pda_tbase() or clk)
+        x_offset = float(channel.xoffset() or 0)
+        try:
+            if channel.is_bool():
+                return resample(channel.data, times_ns, base, x_offset, 'hold', 0, 'uint8')
+            return resample(channel.data, times_ns, base, x_offset, 'hold', np.nan, 'float32')
+        finally:
+            channel.release()  # COM 后端取回的整通道数据不随打开的文件保留
+
+    def iter_blocks(self, chunk_size: int | None = None, **projection) -> Iterator[pd.DataFrame]:
+        """逐文件（chunk_size 给定时按文件内每 chunk_size 帧）产出数据块，块不跨文件边界。"""
+        for i, frames in enumerate(self.frames):
+            step = chunk_size or max(int(frames), 1)
+            for lo in range(0, int(frames), step):
+                start = int(self.offsets[i]) + lo
+                yield self.read(frames=(start, min(start + step, int(self.offsets[i + 1]))), **projection)
+
+
+class DatasetChannel:
+    """数据集中的一个通道，按全局帧切片读取，返回每帧一个值的 ndarray（见 IbaDataset.frame_values）。"""
+
+    def __init__(self, dataset: IbaDataset, name: str):
+        self.dataset = dataset
+        self.name = name
+
+    def __len__(self) -> int:
+        return len(self.dataset)
+
+    def __getitem__(self, index) -> np.ndarray:
+        if isinstance(index, int):
+            i, local = self.dataset.locate(index if index >= 0 else index + len(self))
+            return self._read(i, local, local + 1)[0]
+        start, stop, step = index.indices(len(self))
+        if step < 0:
+            raise ValueError('DatasetChannel slices do not support a negative step.')
+        parts = [self._read(i, lo, hi) for i, lo, hi in self.dataset._spans(start, stop)]
+        data = np.concatenate(parts) if parts else np.zeros(0)
+        return data[::step] if step != 1 else data
+
+    def _read(self, i: int, lo: int, hi: int) -> np.ndarray:
+        """第 i 个文件帧区间 [lo, hi) 的通道值，通道可以不是 clk 采样率。"""
+        return self.dataset.frame_values(i, self.dataset.open(i)[self.name], lo, hi)
@@ -0,0 +1,174 @@
+"""
+数字量通道的紧凑存储。
+
+数字量每个采样点只有 0/1，按 int8/float64 存放时每点 1~8 字节。这里提供两种表示：
+
+- PackedDigital: np.packbits 位压缩（little 位序，与 Arrow 布尔数组的内存布局一致），每点 1 bit，
+  转为 Arrow/Parquet 布尔列时不复制；
+- DigitalRuns: 游程编码，只保存状态变化的位置，内存与状态变化次数成正比，适合长时间不变的信号。
+
+两者都提供 unpack（解压为 bool 数组，可只解压一段）、changes/rising/falling（边沿检测，
+不解压整个通道）和 to_arrow（Arrow 布尔数组）。
+
+用法::
+
+    with ShouPDA(path) as file:
+        file.load_data(kind='digital', packed_digital=True)
+        rising = file.digital_data['D0'].rising()
+        df = digital_frame(file.digital_data)   # Arrow 布尔列，写 Parquet 时每点 1 bit
+"""
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+from rle import run_lengths
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+    except ImportError as e:
+        raise ImportError('Arrow boolean output requires pyarrow: pip install pyarrow') from e
+    return pyarrow
+
+
+class PackedDigital:
+    """位压缩的数字量通道，第 k 个采样点为 bits[k // 8] 的第 k % 8 位（little 位序）。"""
+
+    def __init__(self, bits: np.ndarray, count: int):
+        self.bits = np.asarray(bits, dtype=np.uint8)
+        self.count = int(count)
+
+    @classmethod
+    def from_array(cls, values) -> PackedDigital:
+        """由 0/1（或布尔、非零即真）数组压缩。"""
+        values = np.asarray(values)
+        return cls(np.packbits(values != 0, bitorder='little'), len(values))
+
+    def __len__(self) -> int:
+        return self.count
+
+    @property
+    def nbytes(self) -> int:
+        return self.bits.nbytes
+
+    def unpack(self, start: int | None = None, stop: int | None = None) -> np.ndarray:
+        """解压 [start, stop) 区间为 bool 数组，只解压覆盖该区间的字节。"""
+        start, stop, _ = slice(start, stop).indices(self.count)
+        stop = max(stop, start)
+        first = start // 8
+        chunk = np.unpackbits(self.bits[first:-(-stop // 8)], bitorder='little')
+        return chunk[start - first * 8:stop - first * 8].view(bool)
+
+    def value_at(self, positions) -> np.ndarray:
+        """取指定采样点的值。"""
+        positions = np.asarray(positions, dtype=np.int64)
+        return ((self.bits[positions >> 3] >> (positions & 7)) & 1).astype(bool)
+
+    def changes(self) -> np.ndarray:
+        """
+        状态变化的位置 i（x[i] != x[i-1]）。
+
+        在压缩数据上把每个字节与"左移一位并接上前一字节最高位"的自身异或，只解压异或结果非零的字节，
+        耗时与状态变化次数成正比。
+        """
+        if self.count == 0:
+            return np.zeros(0, dtype=np.int64)
+        bits = self.bits
+        carry = np.concatenate(([bits[0] & 1], bits[:-1] >> 7)).astype(np.uint8)  # 第 0 点与自身比较
+        previous = ((bits << 1) & 0xFF).astype(np.uint8) | carry
+        diff = bits ^ previous
+        rows = np.flatnonzero(diff)
+        if len(rows) == 0:
+            return np.zeros(0, dtype=np.int64)
+        hit = np.unpackbits(diff[rows], bitorder='little').reshape(-1, 8)
+        r, c = np.nonzero(hit)
+        positions = rows[r].astype(np.int64) * 8 + c
+        return positions[positions < self.count]  # 去掉末字节填充位
+
+    def rising(self) -> np.ndarray:
+        """上升沿（0 -> 1）的位置。"""
+        changes = self.changes()
+        return changes[self.value_at(changes)]
+
+    def falling(self) -> np.ndarray:
+        """下降沿（1 -> 0）的位置。"""
+        changes = self.changes()
+        return changes[~self.value_at(changes)]
+
+    def runs(self) -> DigitalRuns:
+        """转换为游程编码表示。"""
+        changes = self.changes()
+        starts = np.concatenate(([0], changes)) if self.count else changes
+        return DigitalRuns(starts, self.value_at(starts), self.count)
+
+    def to_arrow(self):
+        """Arrow 布尔数组，直接引用压缩数据，不复制。"""
+        pa = _pyarrow()
+        return pa.BooleanArray.from_buffers(pa.bool_(), self.count, [None, pa.py_buffer(self.bits)])
+
+
+class DigitalRuns:
+    """游程编码的数字量通道：starts[i] 开始为 values[i]，直到下一个游程。"""
+
+    def __init__(self, starts: np.ndarray, values: np.ndarray, count: int):
+        self.starts = np.asarray(starts, dtype=np.int64)
+        self.values = np.asarray(values, dtype=bool)
+        self.count = int(count)
+
+    @classmethod
+    def from_array(cls, values) -> DigitalRuns:
+        values = np.asarray(values) != 0
+        starts, _, run_values = run_lengths(values)
+        return cls(starts, run_values, len(values))
+
+    def __len__(self) -> int:
+        return self.count
+
+    @property
+    def nbytes(self) -> int:
+        return self.starts.nbytes + self.values.nbytes
+
+    def unpack(self, start: int | None = None, stop: int | None = None) -> np.ndarray:
+        """解压 [start, stop) 区间为 bool 数组。"""
+        start, stop, _ = slice(start, stop).indices(self.count)
+        stop = max(stop, start)
+        lo = max(np.searchsorted(self.starts, start, side='right') - 1, 0)
+        hi = np.searchsorted(self.starts, stop, side='left')
+        bounds = np.clip(np.append(self.starts[lo + 1:hi], stop), start, stop)
+        lengths = np.diff(np.concatenate(([start], bounds)))
+        return np.repeat(self.values[lo:hi], lengths)
+
+    def value_at(self, positions) -> np.ndarray:
+        index = np.searchsorted(self.starts, np.asarray(positions, dtype=np.int64), side='right') - 1
+        return self.values[index]
+
+    def changes(self) -> np.ndarray:
+        return self.starts[1:]
+
+    def rising(self) -> np.ndarray:
+        return self.starts[1:][self.values[1:]]
+
+    def falling(self) -> np.ndarray:
+        return self.starts[1:][~self.values[1:]]
+
+    def packed(self) -> PackedDigital:
+        return PackedDigital.from_array(self.unpack())
+
+    def to_arrow(self):
+        return self.packed().to_arrow()
+
+
+def digital_frame(columns: dict, index=None) -> pd.DataFrame:
+    """
+    把 {名称: PackedDigital/DigitalRuns} 转换为 Arrow 布尔列的 DataFrame（每点 1 bit），
+    可直接交给 export_engine 写 Parquet/Feather。columns 中的 'Time' 等非数字量条目作为索引或普通列保留。
+    """
+    data = {}
+    for name, values in columns.items():
+        if isinstance(values, (PackedDigital, DigitalRuns)):
+            data[name] = pd.arrays.ArrowExtensionArray(values.to_arrow())
+        else:
+            data[name] = values
+    return pd.DataFrame(data, index=index)
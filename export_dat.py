@@ -1,41 +1,64 @@
 import os
-import pandas as pd
+import queue
+import threading
+import time
 from multiprocessing import Pool
 from pathlib import Path
+from ibabackend import worker_reader
+from export_engine import output_path, up_to_date
+from manifest import JobManifest
+from schema_cache import cache_counts, init_worker, summarize, worker_cache
 from shouPDA import ShouPDA
 import shutil
 
 hebing_dir = r'E:\baoSteel\ibaAPI\test\ToCSV FromAny\output'  # PDA文件和板形数据合并后的导出路径
+export_format = 'csv'  # 导出格式：csv/parquet/feather
 
 def run(tup):
     """
         合并文件子程序
         tup=[temp_path,old_path],columns为所需变量
+        返回 {'path', 'open', 'export', 'outputs', 'skipped', 'schema_hits', 'schema_misses'}，
+        文件名不含 'H' 的文件不导出，skipped 为 True
     """
 
     path = tup[0]  # 缓存路径
     if os.path.splitext(path)[-1] != '.dat': return
     old_path = tup[1]  # 源路径，需要获取月份
 
+    stats = {'path': old_path, 'open': 0.0, 'export': 0.0, 'outputs': [], 'skipped': False,  # 耗时单位为秒
+             'schema_hits': 0, 'schema_misses': 0}
     # try:
-    if 'H' in os.path.basename(path):
+    if 'H' not in os.path.basename(path):
+        stats['skipped'] = True
+    else:
         # print(base_file_name(path))
-        file_name  = os.path.basename(path).split('_')[0]
-        with ShouPDA(path, name_target=None, down_sample=15) as file:
-            file.load_data()
-            analog_data = pd.DataFrame(file.analog_data)
-            digital_data = pd.DataFrame(file.digital_data)
-        analog_data.to_csv(hebing_dir + '/analog/' + '%s.csv' % (file_name), index=False)  # 导出合并文件
-        del analog_data
-        digital_data.to_csv(hebing_dir + '/digital/' + '%s.csv' % (file_name), index=False)  # 导出合并文件
-        del digital_data
-    # except:
-    #     try:
-    #         print(os.path.basename(path), 'error!')
-    #         # with open(r'temp\errorlog.txt', mode='a') as f:
-    #         #     f.write(old_path + ' ' + 'error' + '\n')
-    #     except:
-    #         print('写入日志失败')
+        analog_path, digital_path = output_stems(path)
+        schema_cache = worker_cache()
+        hits, misses = cache_counts(schema_cache)
+        start = time.perf_counter()
+        # 在 init_worker 初始化的进程中复用本进程的 reader 和 schema 缓存
+        with ShouPDA(path, name_target=None, down_sample=15, reader=worker_reader(),
+                     schema_cache=schema_cache) as file:
+            opened = time.perf_counter()
+            # 分块读取、降采样并写出合并文件；COM 后端逐通道读取后立即降采样，同一时刻只有一个全采样率通道
+            stats['outputs'] = file.export_chunks(analog_path, digital_path, export_format)  # 原子写入
+        stats['open'] = opened - start
+        stats['export'] = time.perf_counter() - opened
+        now_hits, now_misses = cache_counts(schema_cache)
+        stats['schema_hits'], stats['schema_misses'] = now_hits - hits, now_misses - misses
+    return stats
+
+
+def output_stems(path):
+    """源文件对应的 (模拟量, 数字量) 导出路径，不含扩展名。"""
+    file_name = os.path.basename(path).split('_')[0]
+    return hebing_dir + '/analog/' + file_name, hebing_dir + '/digital/' + file_name
+
+
+def exported(path):
+    """导出文件都已存在且不早于源文件。"""
+    return up_to_date(path, [output_path(stem, export_format) for stem in output_stems(path)])
 
 
 def walkFile(file):
@@ -48,26 +71,98 @@ def walkFile(file):
     return result
 
 
-def make_path(old_pathes, new_dir):
-    """将原来的路径转换成缓存路径"""
-    new_pathes = []
-    for path in old_pathes:
-        new_pathes.append(os.path.join(new_dir, os.path.basename(path)))
-    return new_pathes
-
+def pipeline(pathes, temp_path, workers=12, max_staged=None, manifest=None, skip_up_to_date=True,
+             schema_path=None):
+    """
+    流水线导出：拷贝线程把文件预取到固态缓存，常驻进程池解码导出，每个文件完成后立即删除其缓存。
 
-def copy(old_pathes):
-    """复制文件至缓存文件夹"""
-    new_pathes = make_path(old_pathes, r'D:\多线程暂时存放空间')  # 建立缓存文件路径
-    # print(new_pathes)
-    for i in range(len(old_pathes)):
-        shutil.copyfile(old_pathes[i], new_pathes[i])  # 复制文件
+    拷贝、解码、写出三个阶段重叠进行，吞吐量由最慢的阶段决定，而不是由每批中最慢的文件决定。
 
+    Args:
+        pathes: 源文件路径列表（慢速归档盘）。
+        temp_path: 固态缓存目录。
+        workers: 解码进程数。
+        max_staged: 缓存中同时存放的最大文件数，默认 2 * workers。
+        manifest (JobManifest, optional): 任务清单，给定时跳过已完成的文件并记录每个文件的结果。
+        skip_up_to_date: 导出文件已存在且不早于源文件时不再拷贝和导出。
+        schema_path: 通道元数据缓存（SchemaCache）路径，每个解码进程打开一次；None 时不使用缓存。
 
-def remove(pathes):
-    """删除缓存文件"""
-    for i in range(len(pathes)):
-        os.remove(pathes[i])  # 删除缓存路径
+    Returns:
+        list: 失败的 (源路径, 异常) 列表。
+    """
+    pathes = [path for path in pathes if os.path.splitext(path)[-1] == '.dat']
+    if manifest is not None:
+        pathes = manifest.sync(pathes)
+    if skip_up_to_date:
+        todo = []
+        for path in pathes:
+            if not exported(path):
+                todo.append(path)
+            elif manifest is not None:
+                manifest.record(path, [output_path(stem, export_format) for stem in output_stems(path)])
+        pathes = todo
+    max_staged = max_staged or 2 * workers
+    slots = threading.BoundedSemaphore(max_staged)  # 限制缓存占用
+    done = queue.Queue()
+    failed = []
+
+    def finished(staged, old_path, stats=None, error=None):
+        """进程池回调：删除缓存、释放名额、通知主线程。"""
+        try:
+            os.remove(staged)
+        except OSError:
+            print('删除缓存失败', staged)
+        slots.release()
+        done.put((old_path, stats, error))
+
+    # 常驻进程池，每个进程只创建一次 reader；任务逐个提交，空闲进程即取即做
+    with Pool(workers, initializer=init_worker, initargs=(schema_path,)) as pool:
+        def prefetch():
+            for old_path in pathes:
+                slots.acquire()
+                staged = os.path.join(temp_path, os.path.basename(old_path))
+                try:
+                    shutil.copyfile(old_path, staged)  # 复制文件
+                except Exception as e:
+                    slots.release()
+                    done.put((old_path, None, e))
+                    continue
+                pool.apply_async(
+                    run, ((staged, old_path),),
+                    callback=lambda stats, s=staged, o=old_path: finished(s, o, stats),
+                    error_callback=lambda e, s=staged, o=old_path: finished(s, o, error=e),
+                )
+
+        copier = threading.Thread(target=prefetch, daemon=True)
+        copier.start()
+        start = time.perf_counter()
+        open_time = export_time = 0.0
+        succeeded = schema_hits = schema_misses = 0
+        for i in range(1, len(pathes) + 1):
+            old_path, stats, error = done.get()
+            skipped = bool(stats and stats['skipped'])
+            if manifest is not None:
+                manifest.record(old_path, stats['outputs'] if stats else None, error, skipped)
+            if error is not None:
+                print(os.path.basename(old_path), 'error!', error)
+                failed.append((old_path, error))
+            elif skipped:
+                print(os.path.basename(old_path), '不是 H 文件，未导出')
+            elif stats is not None:
+                succeeded += 1
+                open_time += stats['open']
+                export_time += stats['export']
+                schema_hits += stats['schema_hits']
+                schema_misses += stats['schema_misses']
+            elapsed = time.perf_counter() - start
+            print(f'已处理文件数量 {i}/{len(pathes)}，剩余{(1 - i / len(pathes)) * 100:.2f}%，'
+                  f'平均 {elapsed / i:.2f} s/文件')
+        copier.join()
+    if succeeded:  # 只按成功导出的文件计算单个文件的耗时
+        print(f'平均打开耗时 {open_time / succeeded:.3f} s/文件，平均导出耗时 {export_time / succeeded:.3f} s/文件')
+    if schema_path is not None:
+        print(summarize(schema_hits, schema_misses))
+    return failed
 
 
 if __name__ == '__main__':
@@ -76,13 +171,6 @@ if __name__ == '__main__':
     # col_data = pd.read_excel(r'C:\Users\717-2\Desktop\合并文件所需变量.xlsx', header=0)  # 合并文件所需的PDA变量名
     # col_data = pd.read_csv(r'E:\baoSteel\ibaAPI\data\合并文件所需变量.csv', header=0,encoding='gbk')  # 合并文件所需的PDA变量名
     # print(columns)
-    from multiprocessing import Process, Manager, Pool, Lock
-    import functools
-    import os
-
-    result = Manager().list()
-    pt = functools.partial(run)
-    copy_mission = functools.partial(copy)
 
     # pathes = walkFile(r'F:\首钢酸轧pda数据完整')  # dat文件的文件夹路径
     pathes = walkFile(r'E:\baoSteel\ibaAPI\test')  # dat文件的文件夹路径
@@ -94,21 +182,9 @@ if __name__ == '__main__':
 
     # os.mkdir(temp_path)
 
-    length = len(pathes)
-    size = 12
-    for i in range(0, len(pathes), size):
-        new_pathes = make_path(pathes[i:i + size], temp_path)
-        copy(pathes[i:i + size])
-        pool = Pool(size)
-        resultList = pool.map(pt, [(o, p) for o, p in zip(new_pathes, pathes[i:i + size])], chunksize=None)
-        pool.close()
-        pool.join()
-        try:
-            remove(new_pathes)
-        except:
-            print('删除缓存失败', new_pathes)
-        # new_pathes_temp=new_pathes
-        pec = (1 - (i + size) / length) * 100
-        print('剩余%.2f' % pec + '%')
-        print('=' * 20)
-        print('已处理文件数量', i + size)
+    # 任务清单：中断后重新运行只处理未完成和失败的文件
+    with JobManifest(os.path.join(hebing_dir, 'export_manifest.sqlite')) as manifest:
+        failed = pipeline(pathes, temp_path, workers=12, manifest=manifest,
+                          schema_path=os.path.join(hebing_dir, 'schema_cache.sqlite'))
+        print(manifest.summary())
+    print('导出失败的文件', [path for path, _ in failed])
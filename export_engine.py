@@ -0,0 +1,201 @@
+"""
+导出引擎：把钢卷的模拟量/数字量表写成 CSV、Parquet 或 Arrow IPC（Feather）。
+
+Parquet/Feather 保留列的 dtype（float32 模拟量、int8/bool 数字量、datetime 时间列），
+支持按块流式写入（每次 write 追加一个或多个 row group）和压缩。pyarrow 为可选依赖，
+只在使用 Parquet/Feather 时导入。
+
+用法::
+
+    with open_writer(f'{analog_dir}/{steel_id}_analog', 'parquet') as writer:
+        for chunk in chunks:
+            writer.write(chunk)
+
+    write_table(df, f'{digital_dir}/{steel_id}_digital', 'feather')
+
+写出过程是原子的：数据先写入同目录下的临时文件，关闭时 fsync 后再用 os.replace 改名为目标文件；
+写出过程中出错（with 块内抛出异常）时删除临时文件。因此输出文件要么完整，要么不存在。
+"""
+from __future__ import annotations
+
+import os
+
+import pandas as pd
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ImportError('Parquet/Feather export requires pyarrow: pip install pyarrow') from e
+    return pyarrow
+
+
+def output_path(path: os.PathLike, fmt: str = 'csv') -> str:
+    """返回不含扩展名的输出路径在给定格式下的实际文件路径。"""
+    return os.fspath(path) + _writer_class(fmt).suffix
+
+
+def up_to_date(source: os.PathLike, outputs) -> bool:
+    """所有输出文件都存在且不早于源文件时返回 True，用于增量导出时跳过未改动的文件。"""
+    source_mtime = os.path.getmtime(source)
+    try:
+        return all(os.path.getmtime(output) >= source_mtime for output in outputs)
+    except OSError:
+        return False
+
+
+def _fsync(path: str):
+    with open(path, 'rb+') as f:
+        os.fsync(f.fileno())
+
+
+class TableWriter:
+    """表格写出器基类，按块写入 DataFrame。先写临时文件 tmp_path，close 时原子地改名为 path。"""
+
+    suffix = ''
+
+    def __init__(self, path: os.PathLike):
+        self.path = os.fspath(path)
+        self.tmp_path = f'{self.path}.{os.getpid()}.tmp'
+        self.rows = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def write(self, df: pd.DataFrame):
+        """追加一块数据，各块的列必须一致。"""
+        self._write(df)
+        self.rows += len(df)
+
+    def _write(self, df: pd.DataFrame):
+        raise NotImplementedError
+
+    def _close(self):
+        """关闭底层写出器（子类实现）。"""
+
+    def close(self):
+        """完成写出：关闭、fsync 临时文件并改名为目标文件。没有写入任何数据时不产生输出文件。"""
+        self._close()
+        if os.path.exists(self.tmp_path):
+            _fsync(self.tmp_path)
+            os.replace(self.tmp_path, self.path)
+
+    def abort(self):
+        """放弃写出，删除临时文件，保留原有的目标文件不变。"""
+        try:
+            self._close()
+        finally:
+            if os.path.exists(self.tmp_path):
+                os.remove(self.tmp_path)
+
+
+class CsvWriter(TableWriter):
+    """CSV 写出器，第一块写表头，之后追加。"""
+
+    suffix = '.csv'
+
+    def __init__(self, path: os.PathLike, encoding: str = 'utf-8'):
+        super().__init__(path)
+        self.encoding = encoding
+        self._started = False
+
+    def _write(self, df: pd.DataFrame):
+        first = not self._started
+        df.to_csv(self.tmp_path, mode='w' if first else 'a', header=first, index=False, encoding=self.encoding)
+        self._started = True
+
+
+class ParquetWriter(TableWriter):
+    """Parquet 写出器，每块写为一个或多个 row group。"""
+
+    suffix = '.parquet'
+
+    def __init__(self, path: os.PathLike, compression: str = 'zstd', row_group_size: int | None = None):
+        super().__init__(path)
+        self.compression = compression
+        self.row_group_size = row_group_size
+        self._schema = None
+        self._writer = None
+
+    def _write(self, df: pd.DataFrame):
+        pa = _pyarrow()
+        table = pa.Table.from_pandas(df, schema=self._schema, preserve_index=False)
+        if self._writer is None:
+            self._schema = table.schema
+            self._writer = pa.parquet.ParquetWriter(self.tmp_path, self._schema, compression=self.compression)
+        self._writer.write_table(table, row_group_size=self.row_group_size)
+
+    def _close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+class FeatherWriter(TableWriter):
+    """Arrow IPC（Feather v2）写出器，每块写为一个或多个 record batch。"""
+
+    suffix = '.feather'
+
+    def __init__(self, path: os.PathLike, compression: str | None = 'lz4', row_group_size: int | None = None):
+        super().__init__(path)
+        self.compression = compression
+        self.row_group_size = row_group_size
+        self._schema = None
+        self._writer = None
+
+    def _write(self, df: pd.DataFrame):
+        pa = _pyarrow()
+        table = pa.Table.from_pandas(df, schema=self._schema, preserve_index=False)
+        if self._writer is None:
+            self._schema = table.schema
+            options = pa.ipc.IpcWriteOptions(compression=self.compression)
+            self._writer = pa.ipc.new_file(self.tmp_path, self._schema, options=options)
+        self._writer.write_table(table, max_chunksize=self.row_group_size)
+
+    def _close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+WRITERS: dict[str, type[TableWriter]] = {
+    'csv': CsvWriter,
+    'parquet': ParquetWriter,
+    'feather': FeatherWriter,
+}
+
+
+def _writer_class(fmt: str) -> type[TableWriter]:
+    try:
+        return WRITERS[fmt]
+    except KeyError:
+        raise ValueError(f'Unknown export format: {fmt!r}, expected one of {list(WRITERS)}') from None
+
+
+def open_writer(path: os.PathLike, fmt: str = 'csv', **options) -> TableWriter:
+    """
+    创建写出器。
+
+    Args:
+        path: 输出路径，不含扩展名（按格式自动添加 .csv/.parquet/.feather）。
+        fmt: 'csv'、'parquet' 或 'feather'。
+        **options: 传给写出器的参数，如 compression、row_group_size。
+    """
+    writer_cls = _writer_class(fmt)
+    return writer_cls(os.fspath(path) + writer_cls.suffix, **options)
+
+
+def write_table(df: pd.DataFrame, path: os.PathLike, fmt: str = 'csv', **options) -> str:
+    """一次性写出整张表，返回实际输出路径。"""
+    with open_writer(path, fmt, **options) as writer:
+        writer.write(df)
+    return writer.path
@@ -0,0 +1,324 @@
+"""
+iba .dat 读取后端。
+
+IbaDatFile/IbaChannel 只用到 ibaFiles COM 组件的一小部分接口：
+reader 的 Open/Close/EnumChannels/QueryInfoByName，以及通道的
+QueryInfoByName/QueryTimebasedData/IsDigital 等。本模块把这部分接口抽象为可替换的后端：
+
+- ``com``: ibaFiles COM 组件，只有在第一次使用时才导入 win32com（仅 Windows）。
+- ``memory``: 基于 NumPy 的内存后端，数据来自 ``register`` 注册的 MemoryFile 或 .npz 文件，
+  可在 Linux 上运行整个解码/导出流程并做性能分析。
+- ``native``: .npdat 内存映射后端，见 ibanative。
+
+默认后端由环境变量 ``IBA_BACKEND`` 决定，未设置时为 ``com``。
+"""
+from __future__ import annotations
+
+import importlib
+import json
+import os
+from typing import Callable, Mapping
+
+import numpy as np
+
+CLSID = "{089CC1F3-E635-490B-86F8-7731A185DFD9}"  # ibaFiles reader
+
+_BACKENDS: dict[str, Callable[[], Backend]] = {}
+_instances: dict[str, Backend] = {}
+_LAZY_BACKENDS = {'native': 'ibanative'}  # 首次使用时才导入的后端模块
+_worker_reader = None
+
+
+def register_backend(name: str):
+    """注册后端类的装饰器。"""
+    def decorator(cls):
+        cls.name = name
+        _BACKENDS[name] = cls
+        return cls
+    return decorator
+
+
+def get_backend(backend: str | Backend | None = None) -> Backend:
+    """
+    返回后端实例。每个进程内同名后端只初始化一次。
+
+    Args:
+        backend: 后端名称或后端实例，None 时读取环境变量 IBA_BACKEND（默认 'com'）。
+    """
+    if backend is None:
+        backend = os.environ.get('IBA_BACKEND', 'com')
+    if isinstance(backend, Backend):
+        return backend
+    if backend not in _instances:
+        if backend not in _BACKENDS and backend in _LAZY_BACKENDS:
+            importlib.import_module(_LAZY_BACKENDS[backend])
+        try:
+            factory = _BACKENDS[backend]
+        except KeyError:
+            raise ValueError(f'Unknown iba backend: {backend!r}') from None
+        _instances[backend] = factory()
+    return _instances[backend]
+
+
+def init_worker(backend: str | Backend | None = None):
+    """
+    进程池 initializer：每个工作进程只初始化一次后端并创建一个 reader。
+
+    之后该进程处理的每个文件都通过 IbaDatFile(..., reader=worker_reader()) 复用这个 reader，
+    只需重新 Open，不再重复 Dispatch/初始化后端。
+    """
+    global _worker_reader
+    _worker_reader = get_backend(backend).create_reader()
+
+
+def worker_reader():
+    """返回当前工作进程的 reader；不在 init_worker 初始化的进程中时返回 None。"""
+    return _worker_reader
+
+
+class Backend:
+    """后端基类：创建 reader 对象，并提供通道数据查询所需的输出参数占位。"""
+
+    name = ''
+    variant = None
+    range_reads = False  # 通道数据能否只读取一段采样点（否则分块读取时要先取回整个通道）
+
+    def create_reader(self):
+        """返回一个实现 Open/Close/EnumChannels/QueryInfoByName 的 reader。"""
+        raise NotImplementedError
+
+
+@register_backend('com')
+class ComBackend(Backend):
+    """ibaFiles COM 后端，win32com 在实例化时才导入。"""
+
+    def __init__(self):
+        try:
+            import pythoncom
+            import pywintypes
+            from win32com import client
+        except ImportError as e:
+            raise IOError("win32com is not available, use another iba backend.") from e
+        self._client = client
+        self._com_error = pywintypes.com_error
+        self.variant = client.VARIANT(pythoncom.VT_BYREF | pythoncom.VT_VARIANT, 2)
+
+    def create_reader(self):
+        try:
+            return self._client.dynamic.Dispatch(CLSID)
+        except self._com_error as e:
+            raise IOError("Necessary dlls are not installed.") from e
+
+
+class MemoryChannel:
+    """内存中的通道，接口与 ibaFiles 的通道对象一致。"""
+
+    def __init__(
+            self,
+            name: str,
+            data,
+            unit: str = '',
+            timebase: float = 0.008,
+            xoffset: float = 0.0,
+            digital: bool | None = None,
+            time_based: bool = True,
+            module_number: int = 0,
+            number_in_module: int = 0,
+            channel_id: int = 0,
+            info: Mapping[str, str] | None = None,
+    ):
+        self.values = np.asarray(data)
+        if digital is None:
+            digital = self.values.dtype == bool
+        self.timebase = float(timebase)
+        self.xoffset = float(xoffset)
+        self.digital = bool(digital)
+        self.time_based = bool(time_based)
+        self.ModuleNumber = int(module_number)
+        self.NumberInModule = int(number_in_module)
+        self.channel_id = int(channel_id)
+        self.info = {
+            'name': name,
+            'unit': unit,
+            'xoffset': str(xoffset),
+            '$PDA_Tbase': str(timebase),
+            '$PDA_Typ': 'digital' if self.digital else str(self.values.dtype),
+        }
+        if info:
+            self.info.update(info)
+
+    def QueryInfoByName(self, name: str) -> str:
+        return self.info.get(name, '')
+
+    def IsDefaultTimebased(self) -> bool:
+        return self.time_based
+
+    def IsDigital(self) -> bool:
+        return self.digital
+
+    def IsAnalog(self) -> bool:
+        return not self.digital
+
+    def QueryTimebasedData(self, timebase=None, xoffset=None, data=None):
+        """与 COM 接口一致，返回 (timebase, xoffset, data)。"""
+        return self.timebase, self.xoffset, self.values
+
+    QueryLengthbasedData = QueryTimebasedData
+
+    def QueryChannelId(self) -> int:
+        return self.channel_id
+
+
+class MemoryFile:
+    """内存中的一个 .dat 文件：文件信息字典 + 通道列表。"""
+
+    def __init__(self, info: Mapping[str, str], channels: list[MemoryChannel]):
+        self.info = {key: str(value) for key, value in info.items()}
+        self.channels = list(channels)
+
+    @classmethod
+    def from_datfile(cls, file, info_names=None) -> MemoryFile:
+        """
+        从已打开的 IbaDatFile（任意后端）复制出一个 MemoryFile。
+
+        可在 Windows 上用 COM 后端读取 .dat 后 ``save`` 为 .npz，再拿到 Linux 上使用。
+        """
+        if info_names is None:
+            info_names = getattr(file, 'info', None) or ['clk', 'starttime', 'frames', 'version', 'type', 'name']
+        info = {name: file.query_info_by_name(name) for name in info_names}
+        channels = []
+        for channel in file:
+            raw = channel.channel
+            channels.append(MemoryChannel(
+                channel.name(),
+                channel.data(),
+                unit=channel.unit(),
+                timebase=float(channel.pda_tbase() or 0),
+                xoffset=float(channel.xoffset() or 0),
+                digital=channel.is_bool(),
+                time_based=channel.is_time_based(),
+                module_number=raw.ModuleNumber,
+                number_in_module=raw.NumberInModule,
+                channel_id=channel.id(),
+                info={key: str(raw.QueryInfoByName(key)) for key in ('minscale', 'maxscale', 'digchannel', '$PDA_Typ')},
+            ))
+        return cls(info, channels)
+
+    def save(self, path: os.PathLike):
+        """保存为 .npz：通道数据按原 dtype 保存，元数据以 JSON 存放。"""
+        meta = {
+            'info': self.info,
+            'channels': [
+                {
+                    'timebase': ch.timebase,
+                    'xoffset': ch.xoffset,
+                    'digital': ch.digital,
+                    'time_based': ch.time_based,
+                    'module_number': ch.ModuleNumber,
+                    'number_in_module': ch.NumberInModule,
+                    'channel_id': ch.channel_id,
+                    'info': ch.info,
+                }
+                for ch in self.channels
+            ],
+        }
+        arrays = {f'ch{i}': ch.values for i, ch in enumerate(self.channels)}
+        arrays['meta'] = np.frombuffer(json.dumps(meta).encode('utf-8'), dtype=np.uint8)
+        np.savez(path, **arrays)
+
+    @classmethod
+    def load_info(cls, path: os.PathLike) -> MemoryFile:
+        """只读取 .npz 中的文件信息，返回没有通道的 MemoryFile。"""
+        with np.load(path) as npz:
+            meta = json.loads(npz['meta'].tobytes().decode('utf-8'))
+        return cls(meta['info'], [])
+
+    @classmethod
+    def load(cls, path: os.PathLike) -> MemoryFile:
+        with np.load(path) as npz:
+            meta = json.loads(npz['meta'].tobytes().decode('utf-8'))
+            channels = [
+                MemoryChannel(
+                    item['info']['name'],
+                    npz[f'ch{i}'],
+                    timebase=item['timebase'],
+                    xoffset=item['xoffset'],
+                    digital=item['digital'],
+                    time_based=item['time_based'],
+                    module_number=item['module_number'],
+                    number_in_module=item['number_in_module'],
+                    channel_id=item['channel_id'],
+                    info=item['info'],
+                )
+                for i, item in enumerate(meta['channels'])
+            ]
+        return cls(meta['info'], channels)
+
+
+class ChannelEnumerator:
+    """模拟 EnumChannels() 返回的枚举器。"""
+
+    def __init__(self, channels):
+        self._channels = channels
+        self._pos = 0
+
+    def IsAtEnd(self) -> bool:
+        return self._pos >= len(self._channels)
+
+    def Next(self):
+        channel = self._channels[self._pos]
+        self._pos += 1
+        return channel
+
+
+class MemoryReader:
+    """内存 reader，接口与 ibaFiles COM reader 一致。"""
+
+    def __init__(self, files: Mapping[str, MemoryFile]):
+        self.files = files
+        self.file = None
+        self.PreLoad = 1
+        self.RawMode = 0
+
+    def Open(self, path: str):
+        file = self.files.get(os.fspath(path))
+        if file is None:
+            if not os.path.exists(path):
+                raise FileNotFoundError(path)
+            file = MemoryFile.load(path)
+        self.file = file
+
+    def OpenHeader(self, path: str):
+        """只读文件信息：已登记的文件直接使用，.npz 文件只读取元数据。"""
+        file = self.files.get(os.fspath(path))
+        if file is None:
+            if not os.path.exists(path):
+                raise FileNotFoundError(path)
+            file = MemoryFile.load_info(path)
+        self.file = file
+
+    def Close(self):
+        self.file = None
+
+    def EnumChannels(self) -> ChannelEnumerator:
+        return ChannelEnumerator(self.file.channels)
+
+    def QueryInfoByName(self, name: str) -> str:
+        return self.file.info.get(name, '')
+
+
+@register_backend('memory')
+class MemoryBackend(Backend):
+    """NumPy 内存后端。"""
+
+    range_reads = True
+
+    def __init__(self):
+        self.files: dict[str, MemoryFile] = {}
+
+    def register(self, path: os.PathLike, file: MemoryFile):
+        """将 MemoryFile 注册到给定路径，之后 Open(path) 直接返回它。"""
+        self.files[os.fspath(path)] = file
+
+    def create_reader(self) -> MemoryReader:
+        return MemoryReader(self.files)
@@ -1,35 +1,75 @@
 from __future__ import annotations
 
 import datetime
+import fnmatch
+import functools
 import os
 import pathlib
+import re
 import struct
-from typing import Generator
+from typing import TYPE_CHECKING, Iterable, Iterator
 
 import numpy as np
 import pandas as pd
-import pythoncom
-import pywintypes
-from win32com import client
+
+from ibabackend import Backend, get_backend
+from resample import to_ns
+
+if TYPE_CHECKING:
+    from schema_cache import SchemaCache
 
 A = 0
 B = 0
-V = client.VARIANT(pythoncom.VT_BYREF | pythoncom.VT_VARIANT, 2)  # noqa: F821
 
 # print("Python version: ", struct.calcsize("P") * 8)  # 查看当前python解释器是32位还是64位
 
+# 通道元数据表的列，列名与 IbaChannel 的访问方法同名
+CHANNEL_DTYPE = np.dtype([
+    ('index', object),
+    ('name', object),
+    ('unit', object),
+    ('minscale', object),
+    ('maxscale', object),
+    ('xoffset', object),
+    ('digchannel', object),
+    ('pda_type', object),
+    ('pda_tbase', object),
+    ('is_time_based', bool),
+    ('is_bool', bool),
+    ('is_analog', bool),
+    ('id', np.int64),
+])
+
+
+def _metadata(method):
+    """通道元数据访问器：已建立元数据表时直接读表，否则向后端查询。"""
+    field = method.__name__
+
+    @functools.wraps(method)
+    def wrapper(self):
+        if self.meta is not None:
+            return self.meta[field]
+        return method(self)
+    return wrapper
+
+
 class IbaChannel:
     """
     Class representing a single channel of an iba .dat file
     """
 
-    def __init__(self, channel):
+    def __init__(self, channel, variant=None):
         """Initialize the channel object."""
         self.channel = channel
+        self.variant = variant  # 后端提供的数据输出参数（COM 为 VARIANT）
+        self.meta = None  # 元数据表中的一行，见 IbaDatFile.metadata
+        self._window_source = None  # 分块读取时的整通道数据
 
+    @_metadata
     def index(self):
         return f'[{str(self.channel.ModuleNumber)}:{str(self.channel.NumberInModule)}]'
 
+    @_metadata
     def name(self) -> str:
         """Return the channel name."""
         _name = self.channel.QueryInfoByName("name")
@@ -40,52 +80,70 @@ class IbaChannel:
             _name = _name[1:]
         return _name
 
+    @_metadata
     def minscale(self):
         """Return the channel minscale."""
         return self.channel.QueryInfoByName("minscale")
 
+    @_metadata
     def maxscale(self):
         """Return the channel maxscale."""
         return self.channel.QueryInfoByName("maxscale")
 
+    @_metadata
     def xoffset(self) -> int:
         """返回通道x偏移（以帧为单位）一般值为0。"""
         return self.channel.QueryInfoByName("xoffset")
 
+    @_metadata
     def unit(self) -> str:
         """Return unit of the channel data."""
         return self.channel.QueryInfoByName("unit")
 
+    @_metadata
     def digchannel(self):
         """Return digchannel info."""
         return self.channel.QueryInfoByName("digchannel")
 
+    @_metadata
     def pda_type(self) -> str:
         """Return the data type of the channel. Only used for ShouGang data."""
         return self.channel.QueryInfoByName("$PDA_Typ")
 
+    @_metadata
     def pda_tbase(self) -> str:
         """获取当前频道的采样率，返回字符串. Only used for ShouGang data."""
         return self.channel.QueryInfoByName("$PDA_Tbase")
 
+    @_metadata
     def is_time_based(self) -> bool:
         """返回bool序列是否基于时间。"""
         return self.channel.IsDefaultTimebased()
 
+    @_metadata
     def is_bool(self) -> bool:
         """如果序列包含布尔值，则返回1。"""
         return self.channel.IsDigital()
 
+    @_metadata
     def is_analog(self) -> bool:
         """Return true if series contains analog values."""
         return self.channel.IsAnalog()
 
-    def data(self) -> np.array:
-        """Return the channel data."""
-        if self.is_time_based():
-            data = np.array(self.channel.QueryTimebasedData(A, B, V)[2])
-        else:
-            data = np.array(self.channel.QueryLengthbasedData(A, B, V)[2])
+    def data(self, start: int | None = None, stop: int | None = None) -> np.array:
+        """
+        Return the channel data. 后端返回 ndarray 时不复制（native 后端为内存映射视图）。
+
+        Args:
+            start, stop (int, optional): 按通道自身采样点取 [start, stop) 区间，用于分块读取。
+                memory/native 后端只是视图切片；COM 后端第一次分块读取时取回整个通道并缓存，
+                直到 release() 或文件关闭。
+        """
+        if start is not None or stop is not None:
+            if self._window_source is None:
+                self._window_source = self.data()
+            return self._window_source[start:stop]
+        data = np.asarray(self.query_data())
         # if self.is_bool():
             # return data.astype(bool)
         # elif self.pda_type() == "int16":
@@ -93,14 +151,63 @@ class IbaChannel:
         # else:
         return data
 
+    def release(self):
+        """释放分块读取时缓存的整通道数据。"""
+        self._window_source = None
+
+    def sample_range(self, lo: float | None = None, hi: float | None = None, base: float | None = None,
+                     ) -> tuple[int, int | None]:
+        """
+        把横轴区间 [lo, hi) 换算为通道采样点区间 [start, stop)。
+
+        时间通道的横轴为相对 starttime 的秒，长度通道为长度。第 j 个采样点位于 xoffset + j * pda_tbase，
+        以整数纳秒（长度为 1e-9 单位）计算。base 为通道没有 pda_tbase 时使用的周期，如文件 clk。
+        """
+        step = to_ns(float(self.pda_tbase() or base or 0))
+        if step <= 0:
+            raise ValueError(f'Channel {self.name()!r} has no sample period, pass base.')
+        offset = to_ns(float(self.xoffset() or 0))
+        start = 0 if lo is None else max(-(-(to_ns(lo) - offset) // step), 0)
+        stop = None if hi is None else max(-(-(to_ns(hi) - offset) // step), start)
+        return start, stop
+
+    def window(self, lo: float | None = None, hi: float | None = None, base: float | None = None) -> np.ndarray:
+        """按横轴区间 [lo, hi) 取数据，见 sample_range。native/memory 后端只是视图切片，不解码区间外的数据。"""
+        return self.data(*self.sample_range(lo, hi, base))
+
+    def query_data(self):
+        """后端返回的原始数据（COM 为 tuple，memory/native 后端为 ndarray），不做转换。"""
+        if self.is_time_based():
+            return self.channel.QueryTimebasedData(A, B, self.variant)[2]
+        return self.channel.QueryLengthbasedData(A, B, self.variant)[2]
+
+    def metadata_row(self) -> tuple:
+        """按 CHANNEL_DTYPE 的列顺序返回通道全部元数据。"""
+        return tuple(getattr(self, field)() for field in CHANNEL_DTYPE.names)
+
     def series(self) -> pd.Series:
         return pd.Series(self.data(), name=self.name())
 
+    @_metadata
     def id(self) -> int:
         """Return the channel id."""
         return self.channel.QueryChannelId()
 
 
+def _window_data(channel: IbaChannel, window: tuple[int, int | None], copy: bool = False):
+    """
+    通道采样点区间 window 的数据，读取后立即 release()，COM 后端缓存的整通道数据不随文件保留。
+
+    整个通道时返回后端原始数据（不转换为 float64）；copy=True 时复制区间，不再引用整通道数据。
+    """
+    start, stop = window
+    try:
+        values = channel.query_data() if start == 0 and stop is None else channel.data(start, stop)
+        return np.array(values) if copy else values
+    finally:
+        channel.release()
+
+
 class IbaDatFile:
     """Class representing an Iba .dat file"""
 
@@ -109,6 +216,10 @@ class IbaDatFile:
             path: os.PathLike,
             raw_mode: bool = False,
             preload: bool = True,
+            backend: str | Backend | None = None,
+            schema_cache: SchemaCache | None = None,
+            reader=None,
+            header_only: bool = False,
     ):
         """
         Initialize the dat file object.
@@ -117,18 +228,29 @@ class IbaDatFile:
             path (os.PathLike): dat file path.
             raw_mode (bool, optional): Defaults to False.
             preload (bool, optional): Defaults to True.
+            backend (str | Backend, optional): 读取后端，见 ibabackend. Defaults to $IBA_BACKEND or 'com'.
+            schema_cache (SchemaCache, optional): 通道元数据持久缓存，见 schema_cache. Defaults to None.
+            reader (optional): 复用已创建的 reader（如 ibabackend.worker_reader()），None 时新建. Defaults to None.
+            header_only (bool, optional): 只读文件头和文件信息（starttime/frames/clk/Technostring 等），
+                不读取任何采样数据，也不能访问通道。reader 提供 OpenHeader 时（native/memory 后端）只解析文件信息，
+                COM 后端以 PreLoad=0 打开. Defaults to False.
         """
         self.path = os.fspath(path)
-        try:
-            self.reader = client.dynamic.Dispatch("{089CC1F3-E635-490B-86F8-7731A185DFD9}")
-        except pywintypes.com_error as e:
-            raise IOError("Necessary dlls are not installed.") from e
-        self.reader.PreLoad = int(preload)
+        self.schema_cache = schema_cache
+        self.header_only = header_only
+        self.backend = get_backend(backend)
+        self.reader = reader if reader is not None else self.backend.create_reader()
+        self.reader.PreLoad = 0 if header_only else int(preload)
         self.reader.RawMode = int(raw_mode)
+        self._reset_directory()
 
     def __enter__(self):
         """在进入with语句块时，会执行__enter__方法中的操作，打开文件。"""
-        self.reader.Open(self.path)
+        self._reset_directory()
+        if self.header_only and hasattr(self.reader, 'OpenHeader'):
+            self.reader.OpenHeader(self.path)
+        else:
+            self.reader.Open(self.path)
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
@@ -136,32 +258,154 @@ class IbaDatFile:
         在退出with语句块时，会执行__exit__方法中的操作，关闭文件。
         """
         self.reader.Close()
+        self._reset_directory()  # 通道句柄随文件关闭失效
+
+    def __iter__(self) -> Iterator[IbaChannel]:
+        """__iter__ 方法，可以使用 for 循环对对象进行迭代。通道只在第一次迭代时枚举。"""
+        return iter(self._channel_list())
+
+    def __getitem__(self, index: str | int) -> IbaChannel:
+        """按通道名、'[模块:序号]' 或通道 id（int）查找通道。"""
+        if isinstance(index, int):
+            if self._by_id is None:
+                self._by_id = {}
+                for channel in self._channel_list():
+                    self._by_id.setdefault(channel.id(), channel)
+            directory = self._by_id
+        elif index.startswith('[') and index.endswith(']'):
+            if self._by_index is None:
+                self._by_index = {channel.index(): channel for channel in self._channel_list()}
+            directory = self._by_index
+        else:
+            directory = self._name_directory()
+        try:
+            return directory[index]
+        except KeyError:
+            raise IndexError(index) from None
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._name_directory()
+
+    def _reset_directory(self):
+        """清空通道目录缓存。"""
+        self._channels: list[IbaChannel] | None = None
+        self._names: list[str] | None = None
+        self._by_name: dict[str, IbaChannel] | None = None
+        self._by_index: dict[str, IbaChannel] | None = None
+        self._by_id: dict[int, IbaChannel] | None = None
+        self._metadata: np.ndarray | None = None
+
+    def _channel_list(self) -> list[IbaChannel]:
+        """枚举一次全部通道并缓存。"""
+        if self.header_only:
+            raise ValueError(f'{self.path} is opened header-only, reopen with header_only=False to access channels.')
+        if self._channels is None:
+            channels = []
+            enumerator = self.reader.EnumChannels()  # 获取组名
+            while not enumerator.IsAtEnd():  # 遍历所有频道
+                channel = enumerator.Next()  # 枚举频道
+                if channel is not None:  # 如果频道不为空
+                    channels.append(IbaChannel(channel, self.backend.variant))
+            self._channels = channels
+        return self._channels
+
+    def _name_directory(self) -> dict[str, IbaChannel]:
+        """通道名 -> 通道，重名时保留第一个。"""
+        if self._by_name is None:
+            channels = self._channel_list()
+            if self._metadata is not None:
+                self._names = list(self._metadata['name'])
+            else:
+                self._names = [channel.name() for channel in channels]
+            self._by_name = {}
+            for name, channel in zip(self._names, channels):
+                self._by_name.setdefault(name, channel)
+        return self._by_name
+
+    def metadata(self) -> np.ndarray:
+        """
+        返回全部通道的元数据表（结构化数组，列见 CHANNEL_DTYPE）。
+
+        第一次调用时对每个通道查询一次（设置了 schema_cache 且命中时直接取缓存），
+        之后各通道的 name()/unit()/pda_tbase() 等方法直接读表。
+        """
+        if self._metadata is None:
+            if self.schema_cache is not None:
+                table = self.schema_cache.lookup(self)
+            else:
+                table = self.query_metadata()
+            self._set_metadata(table)
+        return self._metadata
+
+    def query_metadata(self) -> np.ndarray:
+        """逐通道向后端查询元数据，返回新的元数据表。"""
+        return np.array([channel.metadata_row() for channel in self._channel_list()], dtype=CHANNEL_DTYPE)
+
+    def _set_metadata(self, table: np.ndarray):
+        """把元数据表逐行挂到通道上。"""
+        channels = self._channel_list()
+        if len(table) != len(channels):
+            raise ValueError(f'Metadata has {len(table)} rows, file has {len(channels)} channels.')
+        for channel, row in zip(channels, table):
+            channel.meta = row
+        self._metadata = table
+
+    def project(
+            self,
+            names: Iterable[str] | None = None,
+            pattern: str | re.Pattern | None = None,
+            kind: str | None = None,
+            timebase: float | Iterable[float] | None = None,
+    ) -> list[IbaChannel]:
+        """
+        按条件筛选通道（各条件同时满足），返回文件顺序的通道列表。只查元数据表，不读取通道数据。
 
-    def __iter__(self) -> Generator[IbaChannel, None, None]:
-        """__iter__ 方法，可以使用 for 循环对对象进行迭代"""
-        enumerator = self.reader.EnumChannels()  # 获取组名
-        while not enumerator.IsAtEnd():  # 遍历所有频道
-            channel = enumerator.Next()  # 枚举频道
-            if channel is not None:  # 如果频道不为空
-                yield IbaChannel(channel)  # 返回频道对象
-
-    def __getitem__(self, index: str) -> IbaChannel:
-        for channel in self:
-            if channel.name() == index:
-                return channel
-        raise IndexError(index)
-
-    def timeIndex(self) -> pd.DatetimeIndex:
-        """返回数据每一行的时间索引。"""
-        start = self.start_time()
+        Args:
+            names: 通道名集合。
+            pattern: 通道名通配符（如 'ACTUAL*'，区分大小写）或已编译的正则表达式（re.search）。
+            kind: 'analog' 或 'digital'。
+            timebase: 采样周期（秒），一个或多个；通道未给出周期时按文件 clk 计。
+        """
+        channels = self._channel_list()
+        if names is None and pattern is None and kind is None and timebase is None:
+            return list(channels)
+        table = self.metadata()
+        mask = np.ones(len(table), dtype=bool)
+        if names is not None:
+            mask &= np.isin(table['name'], list(set(names)))
+        if pattern is not None:
+            if isinstance(pattern, re.Pattern):
+                match = pattern.search
+            else:
+                match = re.compile(fnmatch.translate(pattern)).match
+            mask &= np.fromiter((match(name) is not None for name in table['name']), dtype=bool, count=len(table))
+        if kind is not None:
+            if kind not in ('analog', 'digital'):
+                raise ValueError(f"Unknown channel kind: {kind!r}, expected 'analog' or 'digital'")
+            mask &= table['is_bool'] == (kind == 'digital')
+        if timebase is not None:
+            wanted = [to_ns(tb) for tb in np.atleast_1d(timebase)]
+            clk = self.clk()
+            tbases = np.array([to_ns(float(tb or clk)) for tb in table['pda_tbase']], dtype=np.int64)
+            mask &= np.isin(tbases, wanted)
+        return [channels[i] for i in np.flatnonzero(mask)]
+
+    def timeIndex(self, step: int = 1) -> pd.DatetimeIndex:
+        """
+        返回数据每一行的时间索引。
+
+        Args:
+            step (int, optional): 降采样步长，直接生成 timeIndex()[::step]，不构造全分辨率时间轴. Defaults to 1.
+        """
         frames = self.frames()
-        clk = self.clk()
-        times = [start + datetime.timedelta(seconds=i * clk) for i in range(frames)]
-        return pd.DatetimeIndex(times, name="time")
+        clk = pd.Timedelta(seconds=self.clk())
+        periods = (frames + step - 1) // step
+        return pd.date_range(self.start_time(), periods=periods, freq=clk * step, name="time")
 
     def channel_names(self) -> list[str]:
         """Return list of channel names."""
-        return [channel.name() for channel in self]
+        self._name_directory()
+        return list(self._names)
 
     def query_info_by_name(self, name: str) -> str:
         return self.reader.QueryInfoByName(name)
@@ -196,18 +440,183 @@ class IbaDatFile:
         """Return the recording start time as str."""
         return self.reader.QueryInfoByName("starttime")
 
-    def data(self) -> pd.DataFrame:
-        """Return data as a dataframe."""
-        data = {channel.name(): channel.data() for channel in self}
-        return pd.DataFrame.from_dict(data)
+    def seconds(self, t) -> float | None:
+        """datetime/Timestamp 换算为相对 starttime 的秒，数值原样返回。"""
+        if t is None:
+            return None
+        if isinstance(t, (datetime.datetime, np.datetime64)):
+            return (pd.Timestamp(t) - pd.Timestamp(self.start_time())).total_seconds()
+        return float(t)
+
+    def sample_ranges(
+            self,
+            channels: Iterable[IbaChannel],
+            frames: tuple[int | None, int | None] | None = None,
+            time: tuple | None = None,
+            length: tuple[float | None, float | None] | None = None,
+    ) -> list[tuple[int, int | None]] | None:
+        """
+        各通道要读取的采样点区间，没有给出任何范围时返回 None。
+
+        Args:
+            frames: 文件帧区间 [start, stop)，按 clk 换算为时间区间，不能与 time 同时给出。
+            time: 时间区间 [t0, t1)，datetime 或相对 starttime 的秒，作用于时间通道。
+            length: 长度区间 [l0, l1)，作用于长度通道。
+            没有对应范围的通道读取全部数据。
+        """
+        clk = self.clk()
+        if frames is not None:
+            if time is not None:
+                raise ValueError('Give either frames or time, not both.')
+            time = tuple(None if frame is None else frame * clk for frame in frames)
+        if time is None and length is None:
+            return None
+        if time is not None:
+            time = tuple(self.seconds(t) for t in time)
+        ranges = []
+        for channel in channels:
+            window = time if channel.is_time_based() else length
+            ranges.append((0, None) if window is None else channel.sample_range(*window, base=clk))
+        return ranges
+
+    def _common_rate(self, channels: list[IbaChannel]) -> tuple[bool, int] | None:
+        """
+        返回通道共同的 (是否时间通道, 采样周期纳秒)，没有通道时返回 None；
+        通道的横轴（时间/长度）和采样周期不全相同时抛出 ValueError。
+        """
+        clk = self.clk()
+        rates = {}
+        for channel in channels:
+            key = (channel.is_time_based(), to_ns(float(channel.pda_tbase() or clk)))
+            rates.setdefault(key, []).append(channel.name())
+        if len(rates) > 1:
+            groups = '; '.join(f"{'time' if time_based else 'length'} {step / 1e9:g}: {', '.join(names[:3])}"
+                               f"{' ...' if len(names) > 3 else ''}" for (time_based, step), names in rates.items())
+            raise ValueError(f'Channels have different sample periods ({groups}), select one with '
+                             f'project(timebase=...) or resample them with ShouPDA.')
+        return next(iter(rates), None)
+
+    def matrix(
+            self,
+            channels: Iterable[IbaChannel] | None = None,
+            frames: tuple[int | None, int | None] | None = None,
+            time: tuple | None = None,
+            length: tuple[float | None, float | None] | None = None,
+    ) -> tuple[np.ndarray, list[str], np.ndarray, list[str]]:
+        """
+        批量读取为预分配的二维矩阵：模拟量一个 float32 块、数字量一个 uint8 块，形状均为 行数 × 通道数。
+
+        每个通道的数据直接写入矩阵的对应列（列在内存中连续），不经过中间的 float64 数组和 dict。
+        矩阵的一行是同一个采样时刻，所以通道必须采样周期相同且同为时间通道或同为长度通道，否则抛出 ValueError：
+        多采样率通道用 project(timebase=...) 分开读取，或用 ShouPDA 重采样到同一网格。
+        不给范围时时间通道的行数为 frames 按采样周期换算的点数，否则为各通道区间内采样点数的最大值；较短的通道（记录提前结束）
+        模拟量末尾填 NaN、数字量填 0，超出行数的部分截断。
+
+        Args:
+            channels: 要读取的通道，默认全部通道（文件顺序）。
+            frames, time, length: 读取范围，见 sample_ranges。只读取区间内的采样点。
+
+        Returns:
+            (analog, analog_names, digital, digital_names)
+        """
+        channels = self._channel_list() if channels is None else list(channels)
+        rate = self._common_rate(channels)
+        ranges = self.sample_ranges(channels, frames, time, length) or [(0, None)] * len(channels)
+        range_of = {id(channel): window for channel, window in zip(channels, ranges)}
+        windows = {}
+        if rate is not None and rate[0]:
+            # 时间通道的采样点数由文件头算出，逐列读取，同一时刻只有一个通道的数据
+            total = -(-self.frames() * to_ns(self.clk()) // rate[1])
+            rows = max(max((min(total if stop is None else stop, total) - start for start, stop in ranges),
+                           default=0), 0)
+        else:
+            # 长度通道的采样点数不能由文件头算出，先读取各通道区间内的数据（复制后即释放整通道数据）
+            windows = {id(channel): _window_data(channel, range_of[id(channel)], copy=True) for channel in channels}
+            rows = max((len(values) for values in windows.values()), default=0)
+        analog = [channel for channel in channels if not channel.is_bool()]
+        digital = [channel for channel in channels if channel.is_bool()]
+        blocks = []
+        for group, dtype, fill in ((analog, np.float32, np.nan), (digital, np.uint8, 0)):
+            # 按列连续存放（rows × n 的 Fortran 序），填列和按列取数都是连续内存
+            block = np.empty((len(group), rows), dtype=dtype).T
+            for j, channel in enumerate(group):
+                values = windows.pop(id(channel)) if windows else _window_data(channel, range_of[id(channel)])
+                n = min(len(values), rows)
+                block[:n, j] = values[:n]
+                block[n:, j] = fill
+            blocks.append(block)
+        return blocks[0], [channel.name() for channel in analog], blocks[1], [channel.name() for channel in digital]
+
+    def digital(self, channels: Iterable[IbaChannel] | None = None, runs: bool = False) -> dict:
+        """
+        按紧凑格式读取数字量通道，返回 {通道名: PackedDigital}（runs=True 时为 DigitalRuns），见 digital 模块。
+
+        Args:
+            channels: 要读取的通道，默认全部数字量通道；其中的模拟量通道被忽略。
+        """
+        from digital import DigitalRuns, PackedDigital
+
+        channels = self.project(kind='digital') if channels is None else list(channels)
+        encode = DigitalRuns.from_array if runs else PackedDigital.from_array
+        return {channel.name(): encode(channel.data()) for channel in channels if channel.is_bool()}
 
+    def data(
+            self,
+            names: Iterable[str] | None = None,
+            pattern: str | re.Pattern | None = None,
+            kind: str | None = None,
+            timebase: float | Iterable[float] | None = None,
+            frames: tuple[int | None, int | None] | None = None,
+            time: tuple | None = None,
+            length: tuple[float | None, float | None] | None = None,
+    ) -> pd.DataFrame:
+        """
+        Return data as a dataframe.
 
-def read_ibadat(path: os.PathLike, raw_mode: bool = False, preload: bool = True) -> pd.DataFrame:
+        基于 matrix() 的两个块构造，不再复制：模拟量列（float32）在前，数字量列（uint8）在后，各自保持文件顺序。
+        筛选条件见 project()，未选中的通道不会被读取；frames/time/length 为读取范围，见 sample_ranges。
+        选中的通道采样周期须相同，见 matrix()。
+        """
+        channels = self.project(names, pattern, kind, timebase)
+        analog, analog_names, digital, digital_names = self.matrix(channels, frames, time, length)
+        return pd.concat([
+            pd.DataFrame(analog, columns=analog_names, copy=False),
+            pd.DataFrame(digital, columns=digital_names, copy=False),
+        ], axis=1)
+
+
+def read_ibadat(
+        path: os.PathLike,
+        raw_mode: bool = False,
+        preload: bool = True,
+        backend: str | Backend | None = None,
+        names: Iterable[str] | None = None,
+        pattern: str | re.Pattern | None = None,
+        kind: str | None = None,
+        timebase: float | Iterable[float] | None = None,
+        frames: tuple[int | None, int | None] | None = None,
+        time: tuple | None = None,
+        length: tuple[float | None, float | None] | None = None,
+) -> pd.DataFrame:
     """
     Read the raw iba .dat file and return the raw data as a dataframe.
+
+    names/pattern/kind/timebase 为通道筛选条件，见 IbaDatFile.project；
+    frames/time/length 为读取范围，见 IbaDatFile.sample_ranges。
     """
-    with IbaDatFile(path, raw_mode, preload) as file:
-        return file.data()
+    with IbaDatFile(path, raw_mode, preload, backend) as file:
+        return file.data(names, pattern, kind, timebase, frames, time, length)
+
+
+def read_info(
+        path: os.PathLike,
+        names: Iterable[str] = ('starttime', 'frames', 'clk'),
+        backend: str | Backend | None = None,
+        reader=None,
+) -> dict[str, str]:
+    """以 header_only 模式打开文件，返回指定的文件信息，不读取任何采样数据。"""
+    with IbaDatFile(path, backend=backend, reader=reader, header_only=True) as file:
+        return {name: file.query_info_by_name(name) for name in names}
 
 
 if __name__ == '__main__':
@@ -0,0 +1,179 @@
+"""
+原生 .npdat 解码后端：不依赖 COM，用 np.memmap 零拷贝读取通道数据。
+
+ibaFiles 的 .dat 二进制格式没有公开文档，因此这里不直接解析 .dat，而是定义一种
+可内存映射的镜像格式 .npdat，由 ``write_npdat`` 从任意后端（通常是 Windows 上的 COM）
+一次性转换得到。之后每个通道的数据都是映射文件上的只读视图，读取时不会产生逐样本的
+Python 对象，也不会整块复制。
+
+文件布局（小端）::
+
+    b'NPDAT\\x00\\x01\\x00'                8 字节魔数
+    通道数据块 ...                          每块按 64 字节对齐，按原 dtype 连续存放
+    JSON footer                            文件信息与每个通道的 dtype/offset/count/元数据
+    uint64 footer 长度
+    b'NPDAT\\x00\\x01\\x00'
+
+用法::
+
+    with IbaDatFile('H124214505100_1.dat', backend='native') as file:  # 读取同名 .npdat
+        data = file['ACTUAL STRIP LENGTH'].data()
+"""
+from __future__ import annotations
+
+import json
+import os
+import struct
+
+import numpy as np
+
+from ibabackend import Backend, ChannelEnumerator, MemoryChannel, register_backend
+
+MAGIC = b'NPDAT\x00\x01\x00'
+ALIGN = 64
+SUFFIX = '.npdat'
+_TAIL = struct.Struct('<Q8s')
+
+
+def npdat_path(path: os.PathLike) -> str:
+    """返回 .dat 文件对应的 .npdat 路径；本身就是 .npdat 时原样返回。"""
+    path = os.fspath(path)
+    if path.endswith(SUFFIX):
+        return path
+    return os.path.splitext(path)[0] + SUFFIX
+
+
+def write_npdat(file, path: os.PathLike | None = None, info_names=None, analog_dtype='float32') -> str:
+    """
+    将已打开的 IbaDatFile（任意后端）转换为 .npdat 文件，逐通道写出，内存占用为单个通道大小。
+
+    Args:
+        file: 已打开的 IbaDatFile。
+        path: 输出路径，默认与源文件同名的 .npdat。
+        info_names: 需要保存的文件信息名，默认使用 file.info 或常用字段。
+        analog_dtype: 模拟量保存类型，iba 模拟量本身为 float32，转换无损。
+
+    Returns:
+        str: 输出文件路径。
+    """
+    path = npdat_path(file.path if path is None else path)
+    if info_names is None:
+        info_names = getattr(file, 'info', None) or ['clk', 'starttime', 'frames', 'version', 'type', 'name']
+    channels = []
+    with open(path, 'wb') as f:
+        f.write(MAGIC)
+        for channel in file:
+            raw = channel.channel
+            digital = bool(channel.is_bool())
+            data = np.asarray(channel.data(), dtype=bool if digital else analog_dtype)
+            pad = -f.tell() % ALIGN
+            f.write(b'\x00' * pad)
+            offset = f.tell()
+            f.write(np.ascontiguousarray(data).tobytes())
+            channels.append({
+                'dtype': data.dtype.str,
+                'offset': offset,
+                'count': int(data.size),
+                'timebase': float(channel.pda_tbase() or 0),
+                'xoffset': float(channel.xoffset() or 0),
+                'digital': digital,
+                'time_based': bool(channel.is_time_based()),
+                'module_number': int(raw.ModuleNumber),
+                'number_in_module': int(raw.NumberInModule),
+                'channel_id': int(channel.id()),
+                'info': {key: str(raw.QueryInfoByName(key))
+                         for key in ('name', 'unit', 'xoffset', 'minscale', 'maxscale', 'digchannel',
+                                     '$PDA_Typ', '$PDA_Tbase')},
+            })
+        footer = json.dumps({
+            'info': {name: str(file.query_info_by_name(name)) for name in info_names},
+            'channels': channels,
+        }).encode('utf-8')
+        f.write(footer)
+        f.write(_TAIL.pack(len(footer), MAGIC))
+    return path
+
+
+class NativeReader:
+    """.npdat reader，接口与 ibaFiles COM reader 一致。"""
+
+    def __init__(self):
+        self.PreLoad = 1
+        self.RawMode = 0
+        self.info: dict[str, str] = {}
+        self.channels: list[MemoryChannel] = []
+        self._mm = None
+
+    def Open(self, path: str):
+        path = npdat_path(path)
+        mm = np.memmap(path, dtype=np.uint8, mode='r')
+        footer_len, magic = _TAIL.unpack(mm[-_TAIL.size:].tobytes())
+        if mm[:len(MAGIC)].tobytes() != MAGIC or magic != MAGIC:
+            raise IOError(f'Not a .npdat file: {path}')
+        footer_start = len(mm) - _TAIL.size - footer_len
+        meta = json.loads(mm[footer_start:footer_start + footer_len].tobytes().decode('utf-8'))
+        self.info = meta['info']
+        self.channels = [
+            MemoryChannel(
+                item['info'].get('name', ''),
+                # 映射文件上的只读视图，不复制数据
+                np.frombuffer(mm, dtype=np.dtype(item['dtype']), count=item['count'], offset=item['offset']),
+                timebase=item['timebase'],
+                xoffset=item['xoffset'],
+                digital=item['digital'],
+                time_based=item['time_based'],
+                module_number=item['module_number'],
+                number_in_module=item['number_in_module'],
+                channel_id=item['channel_id'],
+                info=item['info'],
+            )
+            for item in meta['channels']
+        ]
+        self._mm = mm
+
+    def OpenHeader(self, path: str):
+        """只读取文件末尾的 footer（文件信息），不映射文件、不建立通道。"""
+        path = npdat_path(path)
+        with open(path, 'rb') as f:
+            magic = f.read(len(MAGIC))
+            f.seek(-_TAIL.size, os.SEEK_END)
+            footer_len, tail_magic = _TAIL.unpack(f.read(_TAIL.size))
+            if magic != MAGIC or tail_magic != MAGIC:
+                raise IOError(f'Not a .npdat file: {path}')
+            f.seek(-_TAIL.size - footer_len, os.SEEK_END)
+            meta = json.loads(f.read(footer_len).decode('utf-8'))
+        self.info = meta['info']
+        self.channels = []
+        self._mm = None
+
+    def Close(self):
+        # 不主动关闭映射：调用方持有的视图仍引用它，随视图一起释放
+        self.channels = []
+        self._mm = None
+
+    def EnumChannels(self):
+        return ChannelEnumerator(self.channels)
+
+    def QueryInfoByName(self, name: str) -> str:
+        return self.info.get(name, '')
+
+
+@register_backend('native')
+class NativeBackend(Backend):
+    """.npdat 内存映射后端。"""
+
+    range_reads = True
+
+    def create_reader(self) -> NativeReader:
+        return NativeReader()
+
+
+if __name__ == '__main__':
+    import sys
+
+    from ibadatfile import IbaDatFile
+
+    # 用法: python ibanative.py a.dat [b.dat ...]，使用 COM 后端转换为同名 .npdat
+    for dat_path in sys.argv[1:]:
+        with IbaDatFile(dat_path, backend='com') as dat_file:
+            print('写出', write_npdat(dat_file))
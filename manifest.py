@@ -0,0 +1,104 @@
+"""
+可续跑的导出任务清单（job manifest）。
+
+每次目录级导出在 SQLite（WAL 模式）中记录每个输入文件的大小、修改时间、状态、输出文件和错误信息。
+进程崩溃或中途停止后重新运行时，已完成、未改动且输出文件都还在的文件直接跳过，只处理新文件、改动过的文件、
+失败的文件和输出被删除的文件（删除导出文件即可强制重新导出）。
+
+清单只由主进程写入（工作进程把结果返回主进程），避免多个进程同时写日志文件。
+
+用法::
+
+    manifest = JobManifest('./export_manifest.sqlite')
+    todo = manifest.sync(all_paths)          # 需要处理的文件
+    for stats in pool.imap_unordered(task, todo):
+        manifest.record(stats['path'], stats.get('outputs'), stats.get('error'))
+    print(manifest.summary(), manifest.failed())
+"""
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import time
+
+PENDING = 'pending'
+DONE = 'done'
+FAILED = 'failed'
+SKIPPED = 'skipped'  # 不需要导出的文件（如 export_dat 中文件名不含 'H' 的文件）
+
+
+class JobManifest:
+    """SQLite 导出任务清单。"""
+
+    def __init__(self, path: os.PathLike):
+        self.path = os.fspath(path)
+        self.conn = sqlite3.connect(self.path, timeout=30)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS jobs ('
+            'path TEXT PRIMARY KEY, size INTEGER, mtime REAL, status TEXT NOT NULL, '
+            'outputs TEXT, error TEXT, attempts INTEGER NOT NULL DEFAULT 0, finished REAL)'
+        )
+        self.conn.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def sync(self, paths) -> list[str]:
+        """
+        登记输入文件，返回需要处理的文件（新文件、大小或修改时间变化的文件、未完成或失败的文件、
+        已完成但记录的输出文件不全的文件）。已跳过且未改动的文件不再返回。
+        """
+        known = {
+            row[0]: row[1:]
+            for row in self.conn.execute('SELECT path, size, mtime, status, outputs FROM jobs')
+        }
+        todo = []
+        with self.conn:
+            for path in paths:
+                path = os.fspath(path)
+                st = os.stat(path)
+                row = known.get(path)
+                if row is not None and row[0] == st.st_size and row[1] == st.st_mtime:
+                    if row[2] == DONE and not all(map(os.path.exists, json.loads(row[3] or '[]'))):
+                        self.conn.execute('UPDATE jobs SET status = ? WHERE path = ?', (PENDING, path))
+                        todo.append(path)
+                    elif row[2] not in (DONE, SKIPPED):
+                        todo.append(path)
+                    continue
+                self.conn.execute(
+                    'INSERT OR REPLACE INTO jobs (path, size, mtime, status, attempts) VALUES (?, ?, ?, ?, 0)',
+                    (path, st.st_size, st.st_mtime, PENDING),
+                )
+                todo.append(path)
+        return todo
+
+    def record(self, path: os.PathLike, outputs=None, error=None, skipped: bool = False):
+        """记录一个文件的处理结果：error 不为 None 时标记失败，否则 skipped 时标记跳过、不然标记完成。"""
+        path = os.fspath(path)
+        with self.conn:
+            self.conn.execute(
+                'UPDATE jobs SET status = ?, outputs = ?, error = ?, '
+                'attempts = attempts + 1, finished = ? WHERE path = ?',
+                (FAILED if error is not None else SKIPPED if skipped else DONE, json.dumps(list(outputs or [])),
+                 None if error is None else str(error), time.time(), path),
+            )
+
+    def summary(self) -> dict[str, int]:
+        """各状态的文件数。"""
+        return dict(self.conn.execute('SELECT status, COUNT(*) FROM jobs GROUP BY status').fetchall())
+
+    def failed(self) -> list[tuple[str, str]]:
+        """失败的 (文件, 错误信息) 列表。"""
+        return self.conn.execute('SELECT path, error FROM jobs WHERE status = ?', (FAILED,)).fetchall()
+
+    def outputs(self, path: os.PathLike) -> list[str]:
+        row = self.conn.execute('SELECT outputs FROM jobs WHERE path = ?', (os.fspath(path),)).fetchone()
+        return json.loads(row[0]) if row and row[0] else []
+
+    def close(self):
+        self.conn.close()
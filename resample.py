@@ -0,0 +1,177 @@
+"""
+多采样率通道重采样。
+
+iba 文件中各通道的采样周期（$PDA_Tbase，如 0.008/0.016/0.024/0.032 s）和滞后（xoffset）不同。
+这里直接按时间把每个输出时刻映射到通道采样点序号，只读取覆盖输出时刻的那段通道数据，
+不需要先 np.repeat 成 8ms 全分辨率数组再 [::n] 抽取。时刻以整数纳秒计算，
+0.024/0.008 这类浮点除法不再被截断成 2。
+
+降采样时可用 aggregate 在通道原始采样率上按块求 mean/min/max/first/last/any，
+避免 [::n] 抽取带来的混叠。
+"""
+from __future__ import annotations
+
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+
+MODES = ('hold', 'linear')
+
+
+def to_ns(seconds: float) -> int:
+    """秒 -> 整数纳秒。"""
+    return round(float(seconds) * 1e9)
+
+
+def grid_times(row_start: int, row_stop: int, step_ns: int) -> np.ndarray:
+    """输出网格第 [row_start, row_stop) 行的时刻（相对文件起始，纳秒）。"""
+    return np.arange(row_start, row_stop, dtype=np.int64) * step_ns
+
+
+def sample_index(times_ns: np.ndarray, timebase: float, xoffset: float = 0.0) -> tuple[np.ndarray, np.ndarray]:
+    """
+    返回 times_ns 各时刻之前最近的通道采样点序号，以及距下一个采样点的比例（0~1）。
+
+    通道第 j 个采样点的时刻为 xoffset + j * timebase；序号为负表示该时刻在通道第一个采样点之前。
+    """
+    tb_ns = max(to_ns(timebase), 1)
+    rel = np.asarray(times_ns, dtype=np.int64) - to_ns(xoffset)
+    return rel // tb_ns, (rel % tb_ns) / tb_ns
+
+
+def resample(
+        read: Callable[[int, int], np.ndarray],
+        times_ns: np.ndarray,
+        timebase: float,
+        xoffset: float = 0.0,
+        mode: str = 'hold',
+        fill=np.nan,
+        dtype='float32',
+) -> np.ndarray:
+    """
+    把一个通道重采样到给定的输出时刻。
+
+    Args:
+        read: read(start, stop) 返回通道采样点 [start, stop) 的数据，如 IbaChannel.data。
+        times_ns: 输出时刻（相对文件起始，纳秒）。
+        timebase: 通道采样周期（秒）。
+        xoffset: 通道滞后（秒），可以不是采样周期的整数倍。
+        mode: 'hold' 取前一个采样值；'linear' 在相邻两个采样点间线性插值。
+        fill: 无数据位置（滞后之前、通道结束之后）的填充值。
+        dtype: 输出类型。
+
+    Returns:
+        np.ndarray: 与 times_ns 等长的数组。
+    """
+    if mode not in MODES:
+        raise ValueError(f'Unknown resample mode: {mode!r}, expected one of {MODES}')
+    idx, frac = sample_index(times_ns, timebase, xoffset)
+    out = np.full(len(idx), fill, dtype=dtype)
+    if len(idx) == 0:
+        return out
+    lo = max(int(idx.min()), 0)
+    hi = max(int(idx.max()) + (2 if mode == 'linear' else 1), lo)
+    window = np.asarray(read(lo, hi))
+    local = idx - lo
+    valid = (idx >= 0) & (local < len(window))
+    left = window[local[valid]]
+    if mode == 'hold':
+        out[valid] = left
+    else:
+        right = window[np.minimum(local[valid] + 1, len(window) - 1)]
+        out[valid] = left + (right - left) * frac[valid]
+    return out
+
+
+AGGREGATES = ('first', 'last', 'mean', 'min', 'max', 'any')
+
+
+def reduce_blocks(data: np.ndarray, starts: np.ndarray, how: str = 'mean') -> np.ndarray:
+    """
+    按块归约：第 i 块为 data[starts[i]:starts[i+1]]，最后一块到数组末尾。starts 须严格递增。
+
+    Args:
+        how: 'first'、'last'、'mean'、'min'、'max' 或 'any'（任一非零，用于数字量）。
+    """
+    data = np.asarray(data)
+    starts = np.asarray(starts, dtype=np.intp)
+    if how == 'first':
+        return data[starts]
+    if how == 'last':
+        return data[np.append(starts[1:], len(data)) - 1]
+    if how == 'mean':
+        counts = np.diff(np.append(starts, len(data)))
+        return np.add.reduceat(data, starts, dtype=np.float64) / counts
+    if how == 'min':
+        return np.minimum.reduceat(data, starts)
+    if how == 'max':
+        return np.maximum.reduceat(data, starts)
+    if how == 'any':
+        return np.logical_or.reduceat(data != 0, starts)
+    raise ValueError(f'Unknown aggregate: {how!r}, expected one of {AGGREGATES}')
+
+
+def decimate(data: np.ndarray, n: int, how: str = 'mean') -> np.ndarray:
+    """每 n 个连续样本归约为一个（末尾不足 n 个的也算一块），替代 data[::n]。"""
+    data = np.asarray(data)
+    if len(data) == 0:
+        return data[:0]
+    return reduce_blocks(data, np.arange(0, len(data), n), how)
+
+
+def decimate_frame(df: pd.DataFrame, n: int, how: str = 'mean') -> pd.DataFrame:
+    """
+    DataFrame 版 decimate，替代 df[::n]。
+
+    数值列按 how 归约，布尔列按 'any'，其余列（如时间）取每块第一个值；索引取每块第一行的索引。
+    """
+    out = {}
+    for column in df.columns:
+        values = df[column].to_numpy()
+        if values.dtype == bool:
+            out[column] = decimate(values, n, 'any')
+        elif np.issubdtype(values.dtype, np.floating):
+            out[column] = decimate(values, n, how).astype(values.dtype, copy=False)
+        elif np.issubdtype(values.dtype, np.number):
+            out[column] = decimate(values, n, how)
+        else:
+            out[column] = decimate(values, n, 'first')
+    return pd.DataFrame(out, index=df.index[::n], columns=df.columns)
+
+
+def aggregate(
+        read: Callable[[int, int], np.ndarray],
+        times_ns: np.ndarray,
+        step_ns: int,
+        timebase: float,
+        xoffset: float = 0.0,
+        how: str = 'mean',
+        fill=np.nan,
+        dtype='float32',
+) -> np.ndarray:
+    """
+    在通道自身采样率上聚合：输出第 r 行为时刻区间 [times_ns[r], times_ns[r] + step_ns) 内全部采样点的归约值。
+
+    区间内没有采样点（通道比输出网格慢）时退化为 resample 的保持值。
+    参数含义同 resample，how 见 reduce_blocks。
+    """
+    out = np.full(len(times_ns), fill, dtype=dtype)
+    if len(out) == 0:
+        return out
+    tb_ns = max(to_ns(timebase), 1)
+    rel = np.asarray(times_ns, dtype=np.int64) - to_ns(xoffset)
+    first = -(-rel // tb_ns)  # 区间内第一个采样点
+    end = -(-(rel + step_ns) // tb_ns)  # 区间后第一个采样点
+    lo = max(int(first.min()), 0)
+    hi = max(int(end.max()), lo)
+    window = np.asarray(read(lo, hi))
+    first = np.clip(first - lo, 0, len(window))
+    end = np.clip(end - lo, 0, len(window))
+    filled = end > first
+    if filled.any():
+        # 相邻行的区间首尾相接，非空区间的起点即可划分 window[:最后一个非空区间的终点]
+        out[filled] = reduce_blocks(window[:end[filled][-1]], first[filled], how)
+    if not filled.all():
+        out[~filled] = resample(read, times_ns[~filled], timebase, xoffset, 'hold', fill, dtype)
+    return out
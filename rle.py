@@ -0,0 +1,41 @@
+"""
+游程编码（run-length encoding）。
+
+把数组中连续相同的值合并为一个游程，返回每个游程的起点、长度和值，全部在 NumPy 中一次完成，
+替代 (s.shift() != s).cumsum() 分组后逐组 groupby.apply 的写法。用于停机（长度长时间不变）检测
+和钢卷边界检测，也可用于数字量的压缩存储。
+"""
+from __future__ import annotations
+
+import numpy as np
+
+
+def run_lengths(values) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    游程编码。浮点数组中连续的 NaN 视为同一个值。
+
+    Returns:
+        (starts, lengths, run_values): 每个游程的起始序号、长度和值，values 为空时均为空数组。
+    """
+    values = np.asarray(values)
+    n = len(values)
+    if n == 0:
+        return np.zeros(0, dtype=np.intp), np.zeros(0, dtype=np.intp), values[:0]
+    changed = values[1:] != values[:-1]
+    if values.dtype.kind in 'fc':
+        changed &= ~(np.isnan(values[1:]) & np.isnan(values[:-1]))
+    starts = np.concatenate(([0], np.flatnonzero(changed) + 1))
+    lengths = np.diff(np.append(starts, n))
+    return starts, lengths, values[starts]
+
+
+def run_decode(lengths, run_values) -> np.ndarray:
+    """run_lengths 的逆运算。"""
+    return np.repeat(np.asarray(run_values), np.asarray(lengths))
+
+
+def long_runs(values, min_length: int) -> tuple[np.ndarray, np.ndarray]:
+    """返回长度不小于 min_length 的游程的 [start, stop) 区间（stop 为游程后第一个序号）。"""
+    starts, lengths, _ = run_lengths(values)
+    keep = lengths >= min_length
+    return starts[keep], starts[keep] + lengths[keep]
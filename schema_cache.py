@@ -0,0 +1,135 @@
+"""
+通道结构（schema）持久缓存。
+
+同一产线的 .dat 文件在很长时间内通道布局完全相同。这里把 IbaDatFile.metadata() 得到的通道元数据表
+（即 ShouPDA.exportFeaturesInfo 导出的内容）存入 SQLite，键为记录仪配置的指纹
+（version、type、clk 以及 Module_name_{i}）。指纹命中时直接使用缓存的元数据，跳过逐通道查询。
+
+用法::
+
+    cache = SchemaCache('./schema_cache.sqlite')
+    with ShouPDA(path, schema_cache=cache) as file:
+        file.load_data()
+    print(cache.stats())
+
+进程池中用 init_worker 作为 initializer，每个工作进程只打开一次缓存（一个 SQLite 连接、一组计数），
+任务内通过 worker_cache() 取得；各任务返回命中/未命中的增量，由主进程汇总。
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+
+import numpy as np
+
+import ibabackend
+from ibadatfile import CHANNEL_DTYPE
+
+FINGERPRINT_INFO = ['version', 'type', 'clk'] + [f'Module_name_{i}' for i in range(64)]
+_worker_cache = None
+
+
+def fingerprint(file) -> str:
+    """返回已打开文件的记录仪配置指纹。"""
+    values = [str(file.query_info_by_name(name)) for name in FINGERPRINT_INFO]
+    return hashlib.sha1(json.dumps(values).encode('utf-8')).hexdigest()
+
+
+class SchemaCache:
+    """以 SQLite 保存的通道元数据缓存，可在多进程间共享同一个数据库文件。"""
+
+    def __init__(self, path: os.PathLike = './schema_cache.sqlite'):
+        self.path = os.fspath(path)
+        self.hits = 0
+        self.misses = 0
+        self._conn = None
+
+    def __getstate__(self):
+        # 传给子进程时不带连接，子进程首次使用时重新连接
+        state = self.__dict__.copy()
+        state['_conn'] = None
+        return state
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, timeout=30)
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS schema ('
+                'fingerprint TEXT PRIMARY KEY, channels INTEGER NOT NULL, metadata TEXT NOT NULL)'
+            )
+        return self._conn
+
+    def get(self, key: str, channels: int) -> np.ndarray | None:
+        """返回缓存的元数据表；不存在或通道数不一致时返回 None。"""
+        row = self.conn.execute(
+            'SELECT channels, metadata FROM schema WHERE fingerprint = ?', (key,)
+        ).fetchone()
+        if row is None or row[0] != channels:
+            return None
+        return np.array([tuple(item) for item in json.loads(row[1])], dtype=CHANNEL_DTYPE)
+
+    def put(self, key: str, table: np.ndarray):
+        with self.conn:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO schema (fingerprint, channels, metadata) VALUES (?, ?, ?)',
+                (key, len(table), json.dumps(table.tolist())),
+            )
+
+    def lookup(self, file) -> np.ndarray:
+        """返回文件的元数据表：命中缓存则直接返回，否则查询文件并写入缓存。"""
+        key = fingerprint(file)
+        table = self.get(key, len(list(file)))
+        if table is not None:
+            self.hits += 1
+            return table
+        self.misses += 1
+        table = file.query_metadata()
+        self.put(key, table)
+        return table
+
+    def stats(self) -> dict:
+        """命中/未命中次数及命中率。"""
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+        }
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+def init_worker(path: os.PathLike | None = None, backend=None):
+    """
+    进程池 initializer：除 ibabackend.init_worker 创建的 reader 外，每个工作进程只打开一次 SchemaCache。
+
+    Args:
+        path: 缓存数据库路径，None 时不使用缓存。
+        backend: 读取后端，见 ibabackend。
+    """
+    global _worker_cache
+    ibabackend.init_worker(backend)
+    _worker_cache = SchemaCache(path) if path is not None else None
+
+
+def worker_cache() -> SchemaCache | None:
+    """返回当前工作进程的 SchemaCache；未用 init_worker 初始化或未给出路径时返回 None。"""
+    return _worker_cache
+
+
+def cache_counts(cache: SchemaCache | None) -> tuple[int, int]:
+    """(命中次数, 未命中次数)，cache 为 None 时为 (0, 0)。任务前后相减即为该任务的增量。"""
+    return (cache.hits, cache.misses) if cache is not None else (0, 0)
+
+
+def summarize(hits: int, misses: int) -> str:
+    """主进程汇总各任务增量后的输出。"""
+    total = hits + misses
+    return f'schema 缓存命中 {hits} 次，未命中 {misses} 次，命中率 {hits / total if total else 0.0:.1%}'
@@ -3,150 +3,227 @@
 # @Author  : 张洪嘉
 # @File    : shouPDA
 # @Software: PyCharm
-import datetime
+from __future__ import annotations
+
 import os
 from pathlib import Path
 import numpy as np
 import pandas as pd
 import re
-from ibadatfile import IbaDatFile
+import time
+from typing import Iterator
+from ibabackend import Backend, worker_reader
+from digital import PackedDigital
+from export_engine import open_writer, output_path, up_to_date, write_table
+from ibadatfile import IbaChannel, IbaDatFile
+from manifest import JobManifest
+from resample import aggregate, grid_times, resample, to_ns
+from schema_cache import SchemaCache, cache_counts, init_worker as init_cache_worker, summarize, worker_cache
+
+from multiprocessing import Pool
 
-from multiprocessing import Pool, Manager
+
+def coil_id_from_path(path) -> str:
+    """由文件名取钢卷号，如 H124214505100_1.dat -> H124214505100。"""
+    return re.match(r"([^_]+)", os.path.basename(path)).group(1)  # 使用正则表达式提取匹配的部分
 
 
 class ShouPDA(IbaDatFile):
+    # 文件信息字段，类属性只构建一次
+    info = {
+        'clk': 'clk',
+        'typ': 'typ',
+        'version': 'version',
+        'starttime': 'starttime',
+        'frames': 'frames',
+        'starttrigger': 'starttrigger',
+        'stoptrigger': 'stoptrigger',
+        'Technostring 1.technostring': 'Technostring 1.technostring',
+        'Technostring 1.strip number': 'Technostring 1.strip number',
+        'Technostring 1.steel grade': 'Technostring 1.steel grade',
+        'Technostring 1.entry width': 'Technostring 1.entry width',
+        'Technostring 1.exit width': 'Technostring 1.exit width',
+        'Technostring 1.entry thickness': 'Technostring 1.entry thickness',
+        'Technostring 1.exit thickness': 'Technostring 1.exit thickness',
+        'Technostring 1.time': 'Technostring 1.time',
+    }
+    info.update({f'Module_name_{i}': f'Module_name_{i}' for i in range(64)})
+
     def __init__(self,
                  path: os.PathLike,
                  raw_mode: bool = False,
                  preload: bool = True,
                  name_target: list[str] = None,
                  down_sample: int = 1,
+                 backend: str | Backend | None = None,
+                 schema_cache: SchemaCache | None = None,
+                 base_rate: float | None = None,
+                 interpolation: str = 'hold',
+                 aggregation: dict[str, str] | None = None,
+                 reader=None,
+                 header_only: bool = False,
                  ):
-        super().__init__(path, raw_mode, preload)
+        """
+        Args:
+            name_target: 需要读取的通道名，None 为全部通道。
+            down_sample: 在 base_rate 网格上的降采样倍数。
+            base_rate: 输出基准周期（秒），默认使用文件的 clk（通常 0.008）。
+            interpolation: 模拟量重采样方式，'hold' 或 'linear'，见 resample。
+            aggregation: 降采样时按通道类别在原始采样率上聚合，如 {'analog': 'mean', 'digital': 'any'}，
+                可选 first/last/mean/min/max/any；未指定的类别按 interpolation 取点。
+            reader: 复用的 reader，见 ibabackend.worker_reader。
+            header_only: 只读文件头信息，见 IbaDatFile。
+        """
+        super().__init__(path, raw_mode, preload, backend, schema_cache, reader, header_only)
         self.name_target = name_target
         self.analog_data = {}
         self.digital_data = {}
-        self.info = {
-            'clk': 'clk',
-            'typ': 'typ',
-            'version': 'version',
-            'starttime': 'starttime',
-            'frames': 'frames',
-            'starttrigger': 'starttrigger',
-            'stoptrigger': 'stoptrigger',
-            'Technostring 1.technostring': 'Technostring 1.technostring',
-            'Technostring 1.strip number': 'Technostring 1.strip number',
-            'Technostring 1.steel grade': 'Technostring 1.steel grade',
-            'Technostring 1.entry width': 'Technostring 1.entry width',
-            'Technostring 1.exit width': 'Technostring 1.exit width',
-            'Technostring 1.entry thickness': 'Technostring 1.entry thickness',
-            'Technostring 1.exit thickness': 'Technostring 1.exit thickness',
-            'Technostring 1.time': 'Technostring 1.time',
-        }
         self.down_sample = down_sample
+        self.base_rate = base_rate
+        self.interpolation = interpolation
+        self.aggregation = aggregation or {}
         # self.load_data()
 
-        for i in range(64):
-            self.info[f'Module_name_{i}'] = f'Module_name_{i}'
-
     def coil_id(self):
         """Return the coil id."""
-        return re.match(r"([^_]+)", os.path.basename(self.path)).group(1)  # 使用正则表达式提取匹配的部分
-
-    def timeIndex(self) -> pd.DatetimeIndex:
-        """返回数据每一行的时间索引。"""
-        # try:
-        start = self.start_time()
-        frames = self.frames()
-        clk = self.clk()
-        times = [start + datetime.timedelta(seconds=i * clk) for i in range(frames)]
+        return coil_id_from_path(self.path)
+
+    def timeIndex(self, step: int = 1) -> pd.DatetimeIndex:
+        """返回数据每一行的时间索引，step 为降采样步长。"""
+        time_index = super().timeIndex(step)
         self.time_aixs = True
-        return pd.DatetimeIndex(times, name="time")
-        # except Exception as e:
-        #     print(e)
-        #     self.time_aixs = False
-        #     return None
-        
+        return time_index
+
     def query_info(self, name: str) -> str:
         return self.reader.QueryInfoByName(self.info[name])
 
     def exportFeaturesInfo(self, path='./') -> str:
         """导出当前文件特征信息到csv文件"""
+        table = self.metadata()
         init_dict = {
-            'index': [channel.index() for channel in self],
-            'name': [channel.name() for channel in self],
-            'unit': [channel.unit() for channel in self],
-            'base': [channel.pda_tbase() for channel in self],
-            'offset': [channel.xoffset() for channel in self]
+            'index': table['index'],
+            'name': table['name'],
+            'unit': table['unit'],
+            'base': table['pda_tbase'],
+            'offset': table['xoffset'],
         }
         _df = pd.DataFrame(init_dict)
         _df.to_csv(rf'{path}featuresInfo.csv', index=False)
         path = rf'{path}featuresInfo.csv'
         return path
     
-    def load_data(self) -> pd.DataFrame:
-        analog_data = {}
-        digital_data = {}
-        # # 降采样时间序列
-        # try:
-        time_index = self.timeIndex()[::self.down_sample]
-        analog_data['Time'] = time_index
-        digital_data['Time'] = time_index
-        # except:
-        #     print('Time index is not available.')
-        length = len(time_index)
-                
-        for channel in self:
-            name = channel.name()
-            if self.name_target is None:
-                pass
-            else:
-                if channel.name() not in self.name_target:
-                    continue
-                
-            data = channel.data()
-            base = float(channel.pda_tbase())
-            x_offset = float(channel.xoffset())
+    def _grid(self) -> tuple[int, int]:
+        """返回输出网格的 (行数, 行间隔纳秒)。"""
+        step_ns = to_ns(self.base_rate or self.clk()) * self.down_sample
+        duration_ns = self.frames() * to_ns(self.clk())
+        return -(-duration_ns // step_ns), step_ns
+
+    def _target_channels(self, names=None, pattern=None, kind=None, timebase=None) -> list[IbaChannel]:
+        """目标通道：筛选条件见 IbaDatFile.project，names 默认为 name_target。"""
+        self.metadata()
+        return self.project(self.name_target if names is None else names, pattern, kind, timebase)
+
+    def _resample_rows(self, channels, row_start: int, row_stop: int) -> tuple[dict, dict]:
+        """把各通道按自身采样周期和滞后重采样到输出网格的 [row_start, row_stop) 行。"""
+        _, step_ns = self._grid()
+        times_ns = grid_times(row_start, row_stop, step_ns)
+        time_index = pd.DatetimeIndex(pd.Timestamp(self.start_time()) + pd.to_timedelta(times_ns, unit='ns'),
+                                      name='time')
+        analog_data = {'Time': time_index}
+        digital_data = {'Time': time_index}
+        for channel in channels:
+            data = self._resample_channel(channel, times_ns, step_ns)
             if channel.is_analog():
-                if base == '0.008':
-                    data = np.array(data, dtype='float32')
-                else:  # 观察数据采样频率还可能为0.032 0.024等
-                    multiple = int(float(base) / 0.008)  # 重采样的倍数
-                    data = np.array(data, dtype='float32')
-                    if x_offset != 0:  # 如果滞后时间不为0
-                        # print(channel.name() + 'offset is ' + str(x_offset))
-                        start_pot = int(x_offset / 0.008)
-                        offset_init = np.full(start_pot, None, dtype=data.dtype)
-                        tmp = np.repeat(data, multiple, axis=0)[:-start_pot]
-                        data = np.concatenate((offset_init, tmp))
-                    else:  # 如果滞后时间为0
-                        data = np.repeat(data, multiple, axis=0)
-                        
-                data = data[::self.down_sample]
-                if len(data) != length:
-                    print(f'Warning: {name} length is not equal to time index length.')
-                    print(data)
-                analog_data[name] = data
-                del data
-                self.analog_data = analog_data
+                analog_data[channel.name()] = data
             else:
-                if base == '0.008':
-                    data = np.array(data, dtype='int8')
-                else:
-                    data = np.array(data, dtype='int8')
-                    multiple = int(float(base) / 0.008)
-                    if x_offset != 0:
-                        start_pot = int(x_offset / 0.008)
-                        offset_init = np.full(start_pot, 1, dtype='int8')
-                        tmp = np.repeat(data, multiple, axis=0)[:-start_pot]
-                        data = np.concatenate((offset_init, tmp))
-                    else:
-                        data = np.repeat(data, multiple, axis=0)
-                data = data[::self.down_sample]
-                digital_data[name] = data
-                del data
-                self.digital_data = digital_data
-            
+                digital_data[channel.name()] = data
+        return analog_data, digital_data
+
+    def _resample_channel(self, channel, times_ns: np.ndarray, step_ns: int) -> np.ndarray:
+        """把一个通道重采样到输出时刻 times_ns：模拟量为 float32，数字量为 int8。"""
+        try:
+            return self._resample_channel_data(channel, times_ns, step_ns)
+        finally:
+            channel.release()  # COM 后端取回的整通道数据不在通道之间累积
+
+    def _resample_channel_data(self, channel, times_ns: np.ndarray, step_ns: int) -> np.ndarray:
+        base = float(channel.pda_tbase() or self.clk())  # 采样周期还可能为0.016 0.024 0.032等
+        x_offset = float(channel.xoffset() or 0)
+        if channel.is_analog():
+            analog_how = self.aggregation.get('analog')
+            if analog_how:
+                return aggregate(channel.data, times_ns, step_ns, base, x_offset, analog_how, np.nan, 'float32')
+            return resample(channel.data, times_ns, base, x_offset, self.interpolation, np.nan, 'float32')
+        # 数字量只做保持，滞后部分补 1
+        digital_how = self.aggregation.get('digital')
+        if digital_how:
+            return aggregate(channel.data, times_ns, step_ns, base, x_offset, digital_how, 1, 'int8')
+        return resample(channel.data, times_ns, base, x_offset, 'hold', 1, 'int8')
+
+    def load_data(self, names=None, pattern=None, kind=None, timebase=None, packed_digital=False):
+        """
+        读取目标通道，重采样到 base_rate * down_sample 网格，结果存入 analog_data/digital_data。
+
+        Args:
+            names, pattern, kind, timebase: 通道筛选条件，见 IbaDatFile.project；names 默认为 name_target。
+                未选中的通道不会被读取。
+            packed_digital: 数字量逐通道位压缩为 PackedDigital（每点 1 bit），见 digital 模块；
+                可用 digital.digital_frame(self.digital_data, self.digital_data['Time']) 转为 DataFrame。
+        """
+        rows, _ = self._grid()
+        channels = self._target_channels(names, pattern, kind, timebase)
+        if not packed_digital:
+            self.analog_data, self.digital_data = self._resample_rows(channels, 0, rows)
+            return
+        # 逐个数字量通道重采样后立即压缩，同一时刻只有一个通道是每点 1 字节
+        analog = [channel for channel in channels if channel.is_analog()]
+        self.analog_data, self.digital_data = self._resample_rows(analog, 0, rows)
+        _, step_ns = self._grid()
+        times_ns = grid_times(0, rows, step_ns)
+        for channel in channels:
+            if not channel.is_analog():
+                data = self._resample_channel(channel, times_ns, step_ns)
+                self.digital_data[channel.name()] = PackedDigital.from_array(data)
+
+    def iter_chunks(self, chunk_size: int = 3000) -> Iterator[tuple[pd.DataFrame, pd.DataFrame]]:
+        """
+        按降采样后的输出行分块生成 (模拟量, 数字量) DataFrame，每块最多 chunk_size 行。
+
+        后端能按区间读取时（memory/native），每块只读取覆盖该时间窗口的通道采样点，峰值内存由 chunk_size 决定。
+        COM 后端只能取回整个通道：逐个通道取回、重采样到整个输出网格后立即释放原始数据，再按行分块，
+        峰值内存为一个全采样率通道加全部降采样后的输出列（与 load_data 相同）。
+        """
+        channels = self._target_channels()
+        rows, _ = self._grid()
+        if not self.backend.range_reads:
+            analog_data, digital_data = self._resample_rows(channels, 0, rows)
+            for row_start in range(0, rows, chunk_size):
+                window = slice(row_start, min(row_start + chunk_size, rows))
+                yield (pd.DataFrame({name: values[window] for name, values in analog_data.items()}),
+                       pd.DataFrame({name: values[window] for name, values in digital_data.items()}))
+            return
+        for row_start in range(0, rows, chunk_size):
+            analog_data, digital_data = self._resample_rows(channels, row_start, min(row_start + chunk_size, rows))
+            yield pd.DataFrame(analog_data), pd.DataFrame(digital_data)
+
+    def export_chunks(self, analog_path, digital_path, fmt='csv', chunk_size=3000) -> tuple[str, str]:
+        """
+        流式导出：逐块读取、重采样并写出模拟量和数字量表。
+
+        Args:
+            analog_path, digital_path: 输出路径，不含扩展名。
+            fmt: 导出格式，见 export_engine.
+
+        Returns:
+            tuple[str, str]: 模拟量和数字量的实际输出路径。
+        """
+        with open_writer(analog_path, fmt) as analog_writer, open_writer(digital_path, fmt) as digital_writer:
+            for df_analog, df_digital in self.iter_chunks(chunk_size):
+                analog_writer.write(df_analog)
+                digital_writer.write(df_digital)
+        return analog_writer.path, digital_writer.path
+
+
 def get_feature_info():
     pda_data_path = Path('./data/H124214505100_1.dat')
     # target = pd.read_csv(r'E:\baoSteel\ibaAPI\data\合并文件所需变量.csv').iloc[:, 0].tolist()
@@ -161,79 +238,71 @@ def get_feature_info():
     df = df[columns]
     df.to_csv(r'./featuresInfo.csv', index=False)
     
-def export_single_steel(steel_path, analog_dir, digital_dir):
+def export_single_steel(steel_path, analog_dir, digital_dir, schema_cache=None, fmt='csv'):
     pda_data_path = Path(steel_path)
     # target = pd.read_csv(r'E:\baoSteel\ibaAPI\data\合并文件所需变量.csv').iloc[:, 0].tolist()
-    with ShouPDA(pda_data_path, name_target=None, down_sample=5) as file:
+    with ShouPDA(pda_data_path, name_target=None, down_sample=5, schema_cache=schema_cache) as file:
         steel_id = file.coil_id()
         file_name_without_suffix = os.path.splitext(os.path.basename(steel_path))[0]
         print(f'Processing {file_name_without_suffix}...')
         
         file.load_data()
         df_analog = pd.DataFrame.from_dict(file.analog_data)   # 容易出现内存溢出
-        df_analog.to_csv(rf"{analog_dir}/{steel_id}_analog.csv", index=False)  # index=False 可以去掉索引列
-        df_digital = pd.DataFrame.from_dict(file.digital_data)  
-        df_digital.to_csv(rf'{digital_dir}/{steel_id}_digital.csv', index=False)
+        write_table(df_analog, rf"{analog_dir}/{steel_id}_analog", fmt)  # fmt: csv/parquet/feather
+        df_digital = pd.DataFrame.from_dict(file.digital_data)
+        write_table(df_digital, rf'{digital_dir}/{steel_id}_digital', fmt)
+
 
+def chunk_export_single_steel(steel_path, analog_dir, digital_dir, chunk_size=3000, schema_cache=None, fmt='csv',
+                              skip_up_to_date=False):
+    """
+    导出单个文件，异常不向外抛出。输出为原子写入，中途失败不会留下不完整的文件。
 
-def chunk_export_single_steel(steel_path, analog_dir, digital_dir, progress_dict, chunk_size=3000):
+    Args:
+        schema_cache: 通道元数据缓存，None 时使用 schema_cache.init_worker 为本进程打开的缓存。
+        skip_up_to_date: 两个输出文件都已存在且不早于源文件时跳过。
+
+    Returns:
+        dict: {'path', 'open', 'export', 'outputs', 'error', 'skipped', 'schema_hits', 'schema_misses'}，
+            耗时单位为秒，成功时 error 为 None；schema_hits/schema_misses 为本文件的缓存命中/未命中次数。
+    """
     pda_data_path = Path(steel_path)
+    stats = {'path': steel_path, 'open': 0.0, 'export': 0.0, 'outputs': [], 'error': None, 'skipped': False,
+             'schema_hits': 0, 'schema_misses': 0}
+    file_name_without_suffix = os.path.splitext(os.path.basename(steel_path))[0]
+    analog_path = rf"{analog_dir}/{file_name_without_suffix}_analog"
+    digital_path = rf'{digital_dir}/{file_name_without_suffix}_digital'
+    outputs = [output_path(analog_path, fmt), output_path(digital_path, fmt)]
+    if skip_up_to_date and up_to_date(steel_path, outputs):
+        stats['outputs'] = outputs
+        stats['skipped'] = True
+        return stats
 
+    schema_cache = schema_cache if schema_cache is not None else worker_cache()
+    hits, misses = cache_counts(schema_cache)
     try:
-        with ShouPDA(pda_data_path, name_target=None, down_sample=5) as file:
+        start = time.perf_counter()
+        with ShouPDA(pda_data_path, name_target=None, down_sample=5, schema_cache=schema_cache,
+                     reader=worker_reader()) as file:
+            opened = time.perf_counter()
+            stats['open'] = opened - start
             # steel_id = file.coil_id()
-            file_name_without_suffix = os.path.splitext(os.path.basename(steel_path))[0]
-            file.load_data()
-            
-            # 分块处理模拟数据
-            analog_data = file.analog_data
-            analog_keys = list(analog_data.keys())
-            analog_length = len(analog_data[analog_keys[0]])
-            
-            # 分块处理数字数据
-            digital_data = file.digital_data
-            digital_keys = list(digital_data.keys())
-            digital_length = len(digital_data[digital_keys[0]])
-            
-            if analog_length != digital_length:
-                assert 'Analog data length is not equal to digital data length.'
-            
-            if analog_length < chunk_size:
-                df_analog = pd.DataFrame.from_dict(analog_data)
-                df_analog.to_csv(rf"{analog_dir}/{file_name_without_suffix}_analog.csv", index=False)
-                df_digital = pd.DataFrame.from_dict(digital_data)
-                df_digital.to_csv(rf'{digital_dir}/{file_name_without_suffix}_digital.csv', index=False)
-                return
-            
-            for start in range(0, analog_length, chunk_size):
-                chunk_analog = {
-                    key: analog_data[key][start:start + chunk_size] for key in analog_keys}
-                
-                chunk_digital = {
-                    key: digital_data[key][start:start + chunk_size] for key in digital_keys}
-                
-                df_analog_chunk = pd.DataFrame.from_dict(chunk_analog)
-                df_digital_chunk = pd.DataFrame.from_dict(chunk_digital)
-                
-                df_analog_chunk.to_csv(rf"{analog_dir}/{file_name_without_suffix}_analog.csv", mode='a',
-                                    index=False, header=not Path(rf"{analog_dir}/{file_name_without_suffix}_analog.csv").exists())
-                
-                df_digital_chunk.to_csv(rf'{digital_dir}/{file_name_without_suffix}_digital.csv', mode='a',
-                                        index=False, header=not Path(rf'{digital_dir}/{file_name_without_suffix}_digital.csv').exists())
+            # 逐块读取并写出，不再先 load_data 整个文件
+            stats['outputs'] = file.export_chunks(analog_path, digital_path, fmt, chunk_size)
+            stats['export'] = time.perf_counter() - opened
     except Exception as e:
         print(f'Error: {e}')
         print(f'导出失败: {steel_path}')
-        failed_steel.append(steel_path)
-        # 写入日志
-        with open(r'./errorlog.txt', mode='a', encoding='gbk') as f:
-            f.write(steel_path + ' ' + 'error' + '\n')
-        
-    # 更新进度
-    progress_dict[steel_path] = True
-    completed = sum(progress_dict.values())
-    total = len(progress_dict)
-    print(f"Progress: {completed}/{total} ({(completed / total) * 100:.2f}%)")
-    
+        stats['error'] = f'{type(e).__name__}: {e}'
+    now_hits, now_misses = cache_counts(schema_cache)
+    stats['schema_hits'], stats['schema_misses'] = now_hits - hits, now_misses - misses
+    return stats
+
+
+def _chunk_export_task(args):
+    """imap_unordered 只传一个参数。"""
+    return chunk_export_single_steel(*args)
+
 
 if __name__ == '__main__':
     # pda_data_path = Path(r"E:\baoSteel\ibaAPI\test\dat_dir\H123116105000_1_00.dat")
@@ -244,8 +313,6 @@ if __name__ == '__main__':
     #     df_analog = pd.DataFrame.from_dict(file.analog_data)
     #     df_digital = pd.DataFrame.from_dict(file.digital_data)
     #     print(df_analog)
-    global failed_steel
-    failed_steel = []
     analog_dir = r'E:\张洪嘉硕士论文\dataset\1CD61\analog'
     digital_dir = r'E:\张洪嘉硕士论文\dataset\1CD61\digital'
     
@@ -258,13 +325,32 @@ if __name__ == '__main__':
     # steel_dir= r'E:\baoSteel\ibaAPI\test\dat2'
     all_steel_path = [os.path.join(steel_dir, steel) for steel in os.listdir(steel_dir)]
 
-    with Manager() as manager:
-        progress_dict = manager.dict({steel_path: False for steel_path in all_steel_path})
-        with Pool() as pool:
-            # 使用 starmap 将参数传递给每个进程
-            pool.starmap(chunk_export_single_steel, [(steel_path, analog_dir, digital_dir, progress_dict) for steel_path in all_steel_path])
+    schema_path = os.path.join(steel_dir, 'schema_cache.sqlite')
+    # 任务清单：重新运行时跳过已完成的文件，只重试失败和新增的文件
+    manifest = JobManifest(os.path.join(analog_dir, 'export_manifest.sqlite'))
+    todo = manifest.sync(path for path in all_steel_path if path.endswith('.dat'))
+    print(f'共 {len(all_steel_path)} 个文件，待处理 {len(todo)} 个')
+
+    # 常驻进程池：每个进程只创建一次 reader 和 schema 缓存，任务逐个分发，大文件不会拖住其他任务
+    open_time = 0.0
+    opened = schema_hits = schema_misses = 0
+    with Pool(initializer=init_cache_worker, initargs=(schema_path,)) as pool:
+        tasks = [(steel_path, analog_dir, digital_dir, 3000, None, 'csv', True) for steel_path in todo]
+        for completed, stats in enumerate(pool.imap_unordered(_chunk_export_task, tasks, chunksize=1), start=1):
+            manifest.record(stats['path'], stats['outputs'], stats['error'])
+            if stats['error'] is None and not stats['skipped']:
+                opened += 1
+                open_time += stats['open']
+            schema_hits += stats['schema_hits']
+            schema_misses += stats['schema_misses']
+            print(f"Progress: {completed}/{len(todo)} ({(completed / len(todo)) * 100:.2f}%)")
+    if opened:  # 跳过和失败的文件不计入单个文件的打开耗时
+        print(f"平均打开耗时: {open_time / opened:.3f} s/文件")
 
-    print(f'导出失败的文件: {failed_steel}')
+    print(summarize(schema_hits, schema_misses))
+    print(manifest.summary())
+    print(f'导出失败的文件: {manifest.failed()}')
+    manifest.close()
 
     # # 使用tqdm遍历
     # for i in trange(len(all_steel_path), desc='Processing{0}'.format(all_steel_path[0])):
@@ -0,0 +1,70 @@
+"""archive_dir 去重的回归测试：索引记录过期或指向文件自身时不能删除文件。"""
+import os
+
+from archive_dir import MONTH_FOLDERS, ArchiveIndex, archive_directory, archive_file, file_hash
+
+
+def write(path, content=b'H0 data'):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(content)
+    return path
+
+
+def test_duplicate_of_existing_archive_is_removed(tmp_path):
+    base = str(tmp_path)
+    write(os.path.join(base, 'H0_1.dat'))
+    assert archive_directory(base, workers=1) == {'archived': 1, 'duplicates': 0}
+    write(os.path.join(base, 'incoming', 'H0_1.dat'))
+    assert archive_directory(base, workers=1) == {'archived': 0, 'duplicates': 1}
+    assert not os.path.exists(os.path.join(base, 'incoming', 'H0_1.dat'))
+
+
+def test_stale_index_row_does_not_delete_last_copy(tmp_path):
+    base = str(tmp_path)
+    source = write(os.path.join(base, 'H0_1.dat'))
+    digest = file_hash(source)
+    archive_directory(base, workers=1)
+    with ArchiveIndex(os.path.join(base, '.archive_index.sqlite')) as index:
+        (archived,) = [row[0] for row in index.conn.execute('SELECT path FROM archived')]
+    os.remove(archived)  # 归档文件被手动删除，索引记录过期
+
+    write(source)
+    assert archive_directory(base, workers=1) == {'archived': 1, 'duplicates': 0}
+    with ArchiveIndex(os.path.join(base, '.archive_index.sqlite')) as index:
+        path = index.lookup(digest)
+    assert os.path.exists(path)
+
+
+def test_file_is_not_a_duplicate_of_itself(tmp_path):
+    path = write(os.path.join(str(tmp_path), '10月', 'H0_1.dat'))
+    digest = file_hash(path)
+    with ArchiveIndex(os.path.join(str(tmp_path), 'index.sqlite')) as index:
+        index.add(digest, path, 7, 0.0, path)
+        assert archive_file(path, os.path.join(str(tmp_path), '11月'), index, digest, 7, 0.0) == (path, False)
+    assert os.path.exists(path)
+
+
+def test_date_layout_keeps_month_archive(tmp_path):
+    base = str(tmp_path)
+    write(os.path.join(base, 'H0_1.dat'))
+    archive_directory(base, workers=1)
+    manual = write(os.path.join(base, '10月', 'H2_1.dat'), b'H2 data')  # 手动放入月份文件夹，不在索引中
+
+    write(os.path.join(base, 'H1_1.dat'), b'H1 data')
+    assert archive_directory(base, workers=1, layout='date', backend='memory') == {'archived': 1, 'duplicates': 0}
+    archived = [os.path.relpath(os.path.join(root, name), base) for root, _, names in os.walk(base)
+                for name in names if name.endswith('.dat')]
+    assert sum(path.split(os.sep)[0] in MONTH_FOLDERS for path in archived) == 2
+    assert os.path.exists(manual)
+
+
+def test_month_layout_keeps_date_archive(tmp_path):
+    base = str(tmp_path)
+    write(os.path.join(base, 'H0_1.dat'))
+    archive_directory(base, workers=1, layout='date', backend='memory')
+    manual = write(os.path.join(base, '2024', '04', '21', 'H2_1.dat'), b'H2 data')  # 不在索引中
+
+    write(os.path.join(base, 'H1_1.dat'), b'H1 data')
+    assert archive_directory(base, workers=1) == {'archived': 1, 'duplicates': 0}
+    assert os.path.exists(manual)
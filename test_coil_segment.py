@@ -0,0 +1,51 @@
+"""coil_segment.iter_frame_blocks 的回归测试：分块读取按帧时刻对齐各通道。"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from coil_segment import iter_frame_blocks
+from ibabackend import MemoryChannel, MemoryFile, get_backend
+from ibadatfile import IbaDatFile
+
+INFO = {'clk': '0.008', 'frames': '100', 'starttime': '21.04.2024 17:00:00.000000'}
+
+
+def register(path, channels):
+    get_backend('memory').register(path, MemoryFile(dict(INFO), channels))
+    return path
+
+
+def test_chunks_match_whole_file():
+    path = register('chunks.dat', [
+        MemoryChannel('A', np.arange(100.0), timebase=0.008),
+        MemoryChannel('C', np.arange(100.0) * 2, timebase=0.008, channel_id=1),
+        MemoryChannel('L', np.arange(30.0), timebase=0.1, time_based=False, channel_id=2),
+    ])
+    whole = pd.concat(iter_frame_blocks([path], backend='memory'), ignore_index=True)
+    chunked = pd.concat(iter_frame_blocks([path], chunk_size=30, backend='memory'), ignore_index=True)
+    assert list(whole.columns) == ['A', 'C']  # 长度通道没有帧时刻
+    pd.testing.assert_frame_equal(chunked, whole)
+
+
+def test_mixed_rates_are_refused():
+    path = register('mixed.dat', [
+        MemoryChannel('A', np.arange(100.0), timebase=0.008),
+        MemoryChannel('B', np.arange(34.0), timebase=0.024, channel_id=1),
+    ])
+    with pytest.raises(ValueError, match='sample periods'):
+        next(iter_frame_blocks([path], chunk_size=10, backend='memory'))
+
+
+def test_channel_caches_are_released():
+    opened = []
+
+    class RecordingFile(IbaDatFile):
+        def __enter__(self):
+            opened.append(self)
+            return super().__enter__()
+
+    path = register('release.dat', [MemoryChannel('A', np.arange(100.0), timebase=0.008)])
+    blocks = iter_frame_blocks([path], chunk_size=40, backend='memory', file_class=RecordingFile)
+    next(blocks)
+    assert all(channel._window_source is None for channel in opened[0])
+    blocks.close()